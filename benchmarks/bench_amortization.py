@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Amortization engine benchmark: legacy per-row loop vs utils.amortization_engine.
+Run with: python benchmarks/bench_amortization.py [--repeat 200]
+Timing only; tests/test_amortization_engine.py checks the engine's schedules are identical
+to the legacy loop in tests/legacy_reference.py.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from utils.amortization_engine import schedule_columns, columns_to_rows
+from legacy_reference import legacy_calculate_values
+
+PERIODS = [6, 12, 24, 36, 60, 120, 240, 360, 480]
+RATES = [0.21, 0.24, 0.37, 0.40]
+AMOUNTS = [1000, 25000, 350000]
+
+def engine_calculate_values(r, period, amount):
+    return columns_to_rows(schedule_columns(r, period, amount))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'periods':>8}{'legacy us':>12}{'engine us':>12}{'columns us':>12}{'speedup':>10}")
+    for period in PERIODS:
+        legacy = min(timeit.repeat(lambda: legacy_calculate_values(0.24, period, 25000), number=args.repeat, repeat=3)) / args.repeat
+        engine = min(timeit.repeat(lambda: engine_calculate_values(0.24, period, 25000), number=args.repeat, repeat=3)) / args.repeat
+        columns = min(timeit.repeat(lambda: schedule_columns(0.24, period, 25000), number=args.repeat, repeat=3)) / args.repeat
+        print(f"{period:>8}{legacy * 1e6:>12.1f}{engine * 1e6:>12.1f}{columns * 1e6:>12.1f}{legacy / engine:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
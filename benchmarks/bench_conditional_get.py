@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Conditional GET benchmark: client polling of repayment plans and non-defaulter pages.
+Run with: python benchmarks/bench_conditional_get.py [--polls 2000] [--users 500] [--db sqlite:///bench.db]
+Polls each resource once unconditionally, then repeatedly with If-None-Match, and reports
+latency and bytes for full (200) vs revalidated (304) responses. Timing only; 304 and ETag
+invalidation behaviour is covered by tests/test_conditional_get.py.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def get(handler, path, query=None, etag=None):
+    headers = {'Origin': 'http://localhost:3000'}
+    if etag:
+        headers['If-None-Match'] = etag
+    return handler({'httpMethod': 'GET', 'path': path, 'headers': headers, 'queryStringParameters': query,
+                    'body': None}, {})
+
+def poll(handler, resources, etags):
+    """[(status, body bytes, seconds)] for one GET of each (path, query), conditional if etags given"""
+    results = []
+    for i, (path, query) in enumerate(resources):
+        start = time.perf_counter()
+        response = get(handler, path, query, etags[i] if etags else None)
+        results.append((response, len(response['body']), time.perf_counter() - start))
+    return results
+
+def report(label, results):
+    latencies = sorted(seconds for _, _, seconds in results)
+    body_bytes = sum(size for _, size, _ in results)
+    print(f"{label:<28}{len(results):>8}{latencies[len(latencies) // 2] * 1000:>10.3f}"
+          f"{sum(latencies) / len(latencies) * 1000:>10.3f}{body_bytes / len(results):>12.0f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--polls', type=int, default=2000)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--non-defaulters', type=int, default=2000)
+    parser.add_argument('--db', help='database to seed and use; default: a fresh SQLite file per run')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    workdir = tempfile.TemporaryDirectory()
+    os.environ['DATABASE_URL'] = args.db or f"sqlite:///{os.path.join(workdir.name, 'score_handler_etag.db')}"
+    os.environ['METRICS_ENABLED'] = 'false'
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    from bench_load import seed_database, user_id
+    from lambda_function import lambda_handler
+
+    seed_database(args.users, args.non_defaulters, rng)
+    resources = [(f'/repayment-plan/{user_id(rng.randrange(args.users))}', None) for _ in range(args.polls // 2)]
+    resources += [('/non-defaulters', {'limit': '100', 'after': str(rng.randrange(args.non_defaulters))})
+                  for _ in range(args.polls - len(resources))]
+
+    poll(lambda_handler, resources, None)  # First GET per user backfills the stored plan
+    full = poll(lambda_handler, resources, None)
+    etags = [response['headers'].get('ETag') for response, _, _ in full]
+    revalidated = poll(lambda_handler, resources, etags)
+
+    print(f"{'':<28}{'requests':>8}{'p50 ms':>10}{'mean ms':>10}{'body bytes':>12}")
+    for prefix in ('/repayment-plan', '/non-defaulters'):
+        pick = lambda results: [r for r, (path, _) in zip(results, resources) if path.startswith(prefix)]
+        report(f'{prefix} 200', pick(full))
+        report(f'{prefix} 304', pick(revalidated))
+
+if __name__ == '__main__':
+    main()
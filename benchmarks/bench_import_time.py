@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Cold-start import budget for the Lambda entry point, measured with python -X importtime.
+Run with: python benchmarks/bench_import_time.py [--repeat 5] [--budget-ms 50] [--mode lazy|eager]
+Fails (exit 1) in lazy mode if importing lambda_function exceeds the time or module-count
+budget, or pulls in any module that should only load on first use.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ENTRY_POINT = 'lambda_function'
+LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# Heavy or request-specific modules that must stay off the lazy import path
+FORBIDDEN_PREFIXES = ('sqlalchemy', 'psycopg2', 'numpy', 'pandas', 'numpy_financial', 'requests',
+                      'database', 'config', 'models', 'services', 'utils')
+
+def import_profile(mode):
+    """{module: (self us, cumulative us, depth)} for everything lambda_function imports"""
+    env = {**os.environ, 'COLD_START_MODE': mode,
+           'PYTHONPATH': os.pathsep.join([os.path.join(ROOT, 'src'), ROOT])}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {ENTRY_POINT}'],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Children are printed before their parent, so the entry point's subtree is every line
+    # after the previous top-level import up to the entry point itself
+    subtree = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        if depth == 0 and name != ENTRY_POINT:
+            subtree = []
+            continue
+        subtree.append((name, int(self_us), int(cumulative_us), depth))
+        if name == ENTRY_POINT:
+            return {name: (self_us, cumulative_us, depth) for name, self_us, cumulative_us, depth in subtree}
+    raise RuntimeError(f'{ENTRY_POINT} not found in -X importtime output')
+
+def best_of(profiles):
+    """Per-module minimum over repeats (filters scheduler and page-cache noise)"""
+    best = {}
+    for profile in profiles:
+        for name, (self_us, cumulative_us, depth) in profile.items():
+            if name in best:
+                self_us = min(self_us, best[name][0])
+                cumulative_us = min(cumulative_us, best[name][1])
+            best[name] = (self_us, cumulative_us, depth)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mode', choices=['lazy', 'eager'], default='lazy')
+    parser.add_argument('--budget-ms', type=float, default=50.0)
+    parser.add_argument('--max-modules', type=int, default=40)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    import_profile(args.mode)  # Warm-up: writes .pyc files so runs measure imports, not compiles
+    profile = best_of([import_profile(args.mode) for _ in range(args.repeat)])
+    total_ms = profile[ENTRY_POINT][1] / 1000
+
+    print(f"{'module':<48}{'self ms':>10}{'cumul ms':>10}")
+    for name, (self_us, cumulative_us, depth) in sorted(profile.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{'  ' * depth + name:<48}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+    print(f"\n{ENTRY_POINT} ({args.mode}): {total_ms:.1f}ms, {len(profile)} modules")
+
+    if args.mode == 'eager':
+        return
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"import took {total_ms:.1f}ms, budget is {args.budget_ms:.0f}ms")
+    if len(profile) > args.max_modules:
+        failures.append(f"imported {len(profile)} modules, budget is {args.max_modules}")
+    forbidden = sorted(name for name in profile if name.split('.')[0] in FORBIDDEN_PREFIXES)
+    if forbidden:
+        failures.append(f"imported on cold start: {', '.join(forbidden)}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Within budget ({args.budget_ms:.0f}ms, {args.max_modules} modules, no forbidden imports)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Per-stage metrics benchmark: drives every route in-process and reports the stages each one emits
+and what instrumentation costs per request.
+Run with: python benchmarks/bench_instrumentation.py [--requests 200] [--db sqlite:///bench.db]
+Fails (exit 1) if instrumentation costs more than --max-overhead-ms per request.
+EMF schema, cold-start and per-route stage checks live in tests/test_instrumentation.py.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def timed_run(handler, events):
+    start = time.perf_counter()
+    for event in events:
+        handler(event, {})
+    return (time.perf_counter() - start) / len(events) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--db', help='database to seed and use; default: a temporary SQLite file')
+    parser.add_argument('--seed-users', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-overhead-ms', type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.environ['DATABASE_URL'] = args.db or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'score_handler_metrics.db')}"
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    import instrumentation
+    from bench_load import seed_database, synthetic_events, route_key
+    from lambda_function import lambda_handler
+
+    lines = []
+    instrumentation.set_sink(lines.append)
+    seed_database(args.seed_users, 50, rng)
+    del lines[:]
+
+    events = synthetic_events(args.requests, args.seed_users, 50, rng, 'v2')
+    keys = [route_key(event) for event in events]
+    enabled_ms = timed_run(lambda_handler, events)
+
+    stages_seen = {}
+    for key, line in zip(keys, lines):
+        record = json.loads(line)
+        stages_seen.setdefault(key, []).append({name[:-3] for name in record if name.endswith('_ms')})
+
+    print(f"{'route':<34}{'requests':>9}  stages")
+    for key, seen in sorted(stages_seen.items()):
+        print(f"{key:<34}{len(seen):>9}  {', '.join(sorted(set.union(*seen)))}")
+
+    # Same requests with the sink off and no EMF serialization: the difference is the overhead
+    os.environ['METRICS_ENABLED'] = 'false'
+    disabled_ms = min(timed_run(lambda_handler, events) for _ in range(3))
+    os.environ.pop('METRICS_ENABLED')
+    enabled_ms = min([enabled_ms] + [timed_run(lambda_handler, events) for _ in range(2)])
+    overhead_ms = enabled_ms - disabled_ms
+    print(f"\nPer request: {enabled_ms:.3f}ms with metrics, {disabled_ms:.3f}ms without "
+          f"(overhead {overhead_ms:.3f}ms)")
+    if overhead_ms > args.max_overhead_ms:
+        print(f"❌ Instrumentation overhead {overhead_ms:.3f}ms, budget is {args.max_overhead_ms}ms")
+        sys.exit(1)
+    print(f"✅ Instrumentation overhead within the {args.max_overhead_ms}ms budget")
+
+if __name__ == '__main__':
+    main()
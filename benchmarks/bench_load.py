@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Load and latency benchmark for every endpoint, in-process or against run_local.py.
+Run with: python benchmarks/bench_load.py [--events recorded.jsonl] [--target inprocess|http://localhost:8080]
+          [--concurrency 8] [--rate 0] [--requests 2000] [--db sqlite:///bench.db] [--seed-users 1000]
+Replays a JSONL file of API Gateway events (or a synthetic mix; --record saves it for replay)
+and reports p50/p95/p99 latency, throughput and error rate per route. With --rate the load is
+open-loop and latency is measured from each request's scheduled start, so queueing behind slow
+requests is counted. Fails (exit 1) if any route's error rate exceeds --max-error-rate.
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlparse
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+
+SCORE_COLUMNS = ['demographics', 'financialResponsibility', 'riskAversion', 'impulsivity', 'futureOrientation',
+                 'financialKnowledge', 'locusOfControl', 'socialInfluence', 'resilience', 'familismo', 'respect']
+SURVEY_SECTIONS = SCORE_COLUMNS[1:]
+SEED_CHUNK_SIZE = 1000
+
+# (method, path, weight): roughly the production mix, reads dominating
+ROUTE_MIX = [
+    ('POST', '/survey', 3),
+    ('POST', '/clustered-score', 2),
+    ('POST', '/repayment-plan', 3),
+    ('GET', '/repayment-plan/{user_id}', 4),
+    ('GET', '/non-defaulters', 1),
+    ('GET', '/health', 1),
+]
+
+def user_id(i):
+    return f'bench-user-{i}'
+
+def seed_database(users, non_defaulters, rng):
+    """Upsert synthetic user_score, user_amortization_data and non_defaulters rows (idempotent)"""
+    import database
+    from database import init_db, session_scope, upsert
+    from migrations import migrate
+    from models.user_score import UserScore
+    from models.user_amortization_data import UserAmortizationData
+    from models.non_defaulter import NonDefaulter
+
+    init_db()
+    migrate(database.engine)
+    start = time.perf_counter()
+    for model, count, make_row in [
+        (UserScore, users, lambda i: {'userId': user_id(i), 'risk_level': rng.uniform(0, 100),
+                                      **{col: rng.uniform(1, 9) for col in SCORE_COLUMNS}}),
+        # No stored schedule: the first GET per user backfills it, as for pre-migration rows.
+        # Re-seeding must clear a plan stored by an earlier run, or it would outlive its inputs
+        (UserAmortizationData, users, lambda i: {'userId': user_id(i), 'userRisk': rng.uniform(0, 100),
+                                                 'period': rng.choice([6, 12, 24, 36]),
+                                                 'amount': rng.choice([1000, 5000, 25000]),
+                                                 'schedule': None, 'originDate': None, 'inputHash': None}),
+        (NonDefaulter, non_defaulters, lambda i: {'userId': f'bench-nd-{i}', 'risk_level': rng.uniform(0, 100),
+                                                  **{col: rng.uniform(1, 9) for col in SCORE_COLUMNS}}),
+    ]:
+        for offset in range(0, count, SEED_CHUNK_SIZE):
+            with session_scope() as session:
+                upsert(session, model, [make_row(i) for i in range(offset, min(offset + SEED_CHUNK_SIZE, count))],
+                       returning=False)
+    print(f"Seeded {users} users and {non_defaulters} non-defaulters in {time.perf_counter() - start:.1f}s")
+
+def survey_body(uid, rng):
+    return {
+        'demographics': {'idNumber': uid, 'gender': rng.choice(['F', 'M']), 'occupation': 'Empleado'},
+        'sections': {section: {'metadata': {'weight': 1},
+                               'data': {f'q{q}': str(rng.randint(1, 5)) for q in range(10)}}
+                     for section in rng.sample(SURVEY_SECTIONS, 4)}
+    }
+
+def synthetic_events(n, users, non_defaulters, rng, event_format):
+    from run_local import build_event
+    routes = [(method, path) for method, path, _ in ROUTE_MIX]
+    weights = [weight for _, _, weight in ROUTE_MIX]
+    headers = {'Content-Type': 'application/json', 'Origin': 'http://localhost:3000'}
+    events = []
+    for _ in range(n):
+        method, path = rng.choices(routes, weights)[0]
+        uid = user_id(rng.randrange(max(users, 1)))
+        body = None
+        if path in ('/survey', '/clustered-score'):
+            body = survey_body(uid, rng)
+        elif path == '/repayment-plan':
+            body = {'userId': uid, 'amount': rng.choice([1000, 5000, 25000]),
+                    'period': rng.choice([6, 12, 24, 36]), 'payment_type': 'period'}
+        elif path == '/non-defaulters':
+            path = f'/non-defaulters?limit=100&after={rng.randrange(max(non_defaulters, 1))}'
+        events.append(build_event(method, path.replace('{user_id}', uid), headers,
+                                  json.dumps(body) if body is not None else None, event_format))
+    return events
+
+def event_request(event):
+    """(method, path with query, body, headers) from a v1 or v2 proxy event"""
+    if event.get('version') == '2.0':
+        method, path, query = event['requestContext']['http']['method'], event['rawPath'], event.get('rawQueryString')
+    else:
+        method, path, query = event['httpMethod'], event['path'], urlencode(event.get('queryStringParameters') or {})
+    return method, path + (f'?{query}' if query else ''), event.get('body'), event.get('headers') or {}
+
+def route_key(event):
+    from lambda_function import router
+    method, path, _, _ = event_request(event)
+    route, _ = router.match(method, path.split('?')[0])
+    return f"{method} {route.template if route else path.split('?')[0]}"
+
+def in_process_sender():
+    from lambda_function import lambda_handler
+    return lambda event: lambda_handler(event, {})['statusCode']
+
+def http_sender(base_url):
+    """One keep-alive connection per worker thread"""
+    url = urlparse(base_url)
+    local = threading.local()
+
+    def send(event):
+        method, path, body, headers = event_request(event)
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+        try:
+            local.conn.request(method, path, body=body, headers=headers)
+            response = local.conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            local.conn.close()
+            del local.conn
+            raise
+    return send
+
+def run_load(events, send, concurrency, rate):
+    """[(route, status or None, latency s)] and the wall-clock duration"""
+    keys = [route_key(event) for event in events]
+    start = time.perf_counter()
+
+    def one(i):
+        began = time.perf_counter()
+        if rate:
+            scheduled = start + i / rate
+            time.sleep(max(0.0, scheduled - began))
+            began = scheduled
+        try:
+            status = send(events[i])
+        except Exception:
+            status = None
+        return keys[i], status, time.perf_counter() - began
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(len(events))))
+    return results, time.perf_counter() - start
+
+def percentile(sorted_values, p):
+    # Nearest rank
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values))) - 1))]
+
+def summarize(results, seconds):
+    by_route = {}
+    for key, status, latency in results:
+        by_route.setdefault(key, []).append((status, latency))
+    by_route['TOTAL'] = [(status, latency) for _, status, latency in results]
+
+    summary = {}
+    for key, samples in by_route.items():
+        latencies = sorted(latency for _, latency in samples)
+        errors = sum(1 for status, _ in samples if status is None or status >= 500)
+        summary[key] = {
+            'requests': len(samples),
+            'error_rate': errors / len(samples),
+            'rps': len(samples) / seconds,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--events', help='JSONL file of API Gateway events to replay (default: synthetic mix)')
+    parser.add_argument('--record', help='write the synthetic events to this JSONL file')
+    parser.add_argument('--target', default='inprocess', help="'inprocess' or the local server URL")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=0, help='target requests/s (0: as fast as possible)')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--event-format', choices=['v1', 'v2'], default='v2')
+    parser.add_argument('--db', help='database to seed (and use in-process); default: a temporary SQLite file')
+    parser.add_argument('--seed-users', type=int, default=1000)
+    parser.add_argument('--seed-non-defaulters', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-error-rate', type=float, default=0.01)
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db_url = args.db or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'score_handler_bench.db')}"
+    os.environ['DATABASE_URL'] = db_url
+    os.environ.setdefault('DB_POOL_SIZE', str(args.concurrency))
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        if args.seed_users or args.seed_non_defaulters:
+            if args.target != 'inprocess' and not args.db:
+                sys.exit('--db is required to seed the database a local server is using')
+            with contextlib.redirect_stdout(sys.__stdout__):
+                seed_database(args.seed_users, args.seed_non_defaulters, rng)
+
+        if args.events:
+            with open(args.events) as f:
+                events = [json.loads(line) for line in f if line.strip()]
+            events = [events[i % len(events)] for i in range(args.requests)]
+        else:
+            events = synthetic_events(args.requests, args.seed_users, args.seed_non_defaulters, rng, args.event_format)
+        if args.record:
+            with open(args.record, 'w') as f:
+                f.writelines(json.dumps(event) + '\n' for event in events)
+
+        send = in_process_sender() if args.target == 'inprocess' else http_sender(args.target)
+        results, seconds = run_load(events, send, args.concurrency, args.rate)
+
+    summary = summarize(results, seconds)
+    print(f"{len(results)} requests in {seconds:.2f}s against {args.target} "
+          f"(concurrency {args.concurrency}, rate {args.rate or 'unbounded'}, db {db_url.split('://')[0]})")
+    print(f"{'route':<34}{'requests':>9}{'errors':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for key, row in sorted(summary.items(), key=lambda item: (item[0] == 'TOTAL', item[0])):
+        print(f"{key:<34}{row['requests']:>9}{row['error_rate']:>8.1%}{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    failing = [key for key, row in summary.items() if key != 'TOTAL' and row['error_rate'] > args.max_error_rate]
+    if failing:
+        print(f"❌ Error rate above {args.max_error_rate:.1%} for: {', '.join(failing)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Risk model fit benchmark: legacy list-based k-means vs the NumPy engine.
+Run with: python benchmarks/bench_risk_model.py [--sizes 1000 100000 1000000]
+Timing only; tests/test_kmeans_engine.py checks the engine reproduces the legacy centroids
+(tests/legacy_reference.py) when seeded like the legacy code.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from utils.risk_distance_calculator import RiskDistanceCalculator
+from legacy_reference import legacy_fit
+
+FEATURES = 12
+LEGACY_MAX_ROWS = 20000
+
+def synthetic(n, rng):
+    centers = rng.uniform(1, 9, size=(3, FEATURES))
+    return centers[rng.integers(3, size=n)] + rng.normal(0, 0.8, size=(n, FEATURES))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    calculator = RiskDistanceCalculator(initialize=False)
+    print(f"{'rows':>10}{'legacy s':>12}{'numpy s':>12}{'iterations':>12}")
+    for n in args.sizes:
+        X = synthetic(n, rng)
+        legacy = '-'
+        if n <= LEGACY_MAX_ROWS:
+            start = time.perf_counter()
+            legacy_fit(X.tolist(), 3)
+            legacy = f"{time.perf_counter() - start:.3f}"
+        start = time.perf_counter()
+        _, iterations = calculator.fit(X)
+        print(f"{n:>10}{legacy:>12}{time.perf_counter() - start:>12.3f}{iterations:>12}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Cold-start schema bootstrap benchmark: legacy DDL vs version check vs none.
+Run with: python benchmarks/bench_schema_bootstrap.py [--url postgresql://...] [--runs 20]
+Each run uses a fresh engine, like a new Lambda container.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sqlalchemy import create_engine
+
+from database import Base, register_models
+from migrations import check_schema_version, migrate
+
+def legacy_bootstrap(engine):
+    from models.user_amortization_data import UserAmortizationData
+    Base.metadata.create_all(bind=engine)
+    UserAmortizationData.__table__.create(bind=engine, checkfirst=True)
+
+def check_bootstrap(engine):
+    check_schema_version(engine)
+
+def no_bootstrap(engine):
+    pass
+
+def make_engine(url):
+    from config import Config
+    return create_engine(url, **Config.engine_options(url))
+
+def run(url, runs):
+    register_models()
+    migrate(make_engine(url))
+
+    results = {}
+    for name, bootstrap in [('legacy create_all', legacy_bootstrap),
+                            ('version check', check_bootstrap),
+                            ('none (prod)', no_bootstrap)]:
+        timings = []
+        for _ in range(runs):
+            engine = make_engine(url)
+            start = time.perf_counter()
+            bootstrap(engine)
+            timings.append((time.perf_counter() - start) * 1000)
+            engine.dispose()
+        results[name] = timings
+
+    print(f"Schema bootstrap on {url.split('@')[-1]} ({runs} cold engines each)")
+    print(f"{'mode':<20}{'median ms':>12}{'p95 ms':>12}")
+    for name, timings in results.items():
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<20}{statistics.median(timings):>12.2f}{p95:>12.2f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    run(url, args.runs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Likert scoring benchmark: legacy recursive strategies vs the single-pass engine,
+with and without the (sum, count) bias-correction table.
+Run with: python benchmarks/bench_scoring.py [--repeat 200]
+Timing only; equivalence with the legacy strategy and the bit-identical bias table are
+checked by tests/test_question_scoring.py against tests/legacy_reference.py, timed here.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from utils.question_scoring import QuestionScoring, Default
+from legacy_reference import LegacyDefault
+
+SECTION_SIZES = [10, 25, 50, 100, 250, 500]
+
+def make_section(size, rng):
+    values = [str(rng.randint(1, 5)), rng.randint(1, 5), 'n/a', None, '']
+    return {'metadata': {'weight': 1}, 'data': {f'q{i}': rng.choice(values) for i in range(size)}}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 5000))
+    default = Default()
+    print(f"{'questions':>10}{'legacy us':>12}{'engine us':>12}{'table us':>12}{'speedup':>10}")
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = []
+        for size in SECTION_SIZES:
+            section = make_section(size, rng)
+            legacy = min(timeit.repeat(lambda: LegacyDefault().score_question(section), number=args.repeat, repeat=3)) / args.repeat
+            engine = min(timeit.repeat(lambda: default.score_question(section), number=args.repeat, repeat=3)) / args.repeat
+            table = min(timeit.repeat(lambda: QuestionScoring('section').use_scoring(section), number=args.repeat, repeat=3)) / args.repeat
+            rows.append((size, legacy, engine, table))
+    for size, legacy, engine, table in rows:
+        print(f"{size:>10}{legacy * 1e6:>12.1f}{engine * 1e6:>12.1f}{table * 1e6:>12.1f}{legacy / table:>9.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+User risk cache benchmark for the repayment-plan path.
+Run with: python benchmarks/bench_user_risk_cache.py [--lookups 20000] [--users 1000] [--db sqlite:///bench.db]
+Replays skewed get_user_risk lookups (a few users poll often, as clients do) with the cache
+off and on, and reports lookup latency and hit ratio. Timing only; eviction, expiry and
+invalidation-on-commit are covered by tests/test_cache.py.
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def replay(get_user_risk, user_ids):
+    """Mean lookup ms"""
+    start = time.perf_counter()
+    for uid in user_ids:
+        get_user_risk(uid)
+    return (time.perf_counter() - start) / len(user_ids) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--db', help='database to seed and use; default: a temporary SQLite file')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    os.environ['DATABASE_URL'] = args.db or f"sqlite:///{os.path.join(tempfile.gettempdir(), 'score_handler_bench.db')}"
+    logging.basicConfig(level=logging.WARNING)
+    logging.disable(logging.INFO)
+
+    from bench_load import seed_database, user_id
+    from cache import user_risk_cache
+    from services.amortization_service import get_user_risk, load_user_risk
+
+    seed_database(args.users, 0, rng)
+    # Zipf-like popularity: user i is requested with weight 1 / (i + 1)
+    weights = [1 / (i + 1) for i in range(args.users)]
+    lookups = [user_id(i) for i in rng.choices(range(args.users), weights, k=args.lookups)]
+
+    uncached_ms = replay(load_user_risk, lookups)
+    cached_ms = replay(get_user_risk, lookups)
+    print(f"{args.lookups} lookups over {args.users} users: {uncached_ms:.3f}ms uncached, "
+          f"{cached_ms:.3f}ms cached ({uncached_ms / cached_ms:.1f}x), "
+          f"hit ratio {user_risk_cache.hit_ratio():.1%}, {len(user_risk_cache)} entries")
+
+if __name__ == '__main__':
+    main()
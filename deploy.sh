@@ -23,13 +23,15 @@ mkdir -p package/
 echo "Installing dependencies..."
 
 # Install all dependencies with compatible wheels for arm64 Lambda
+# Only what the handler imports, at the versions pinned in requirements.txt (all import on cp313;
+# sqlalchemy needs >=2.0.31 there); every extra package is cold-start weight
 python3 -m pip install \
 --platform manylinux2014_aarch64 \
 --target=package \
 --implementation cp \
 --python-version 3.13 \
 --only-binary=:all: --upgrade \
-numpy pandas numpy-financial psycopg2-binary sqlalchemy requests
+-r requirements.txt
 
 # Copy source code
 echo "Copying source code..."
@@ -46,6 +48,22 @@ cd ..
 echo "Uploading to S3..."
 aws s3 cp function.zip s3://${S3_BUCKET}/score-handler/function.zip
 
+# Apply schema migrations before the new code goes live: prod containers default to
+# SCHEMA_BOOTSTRAP=none and query the new columns without checking. Migrations only add
+# tables/columns/triggers, so the running version keeps working against the new schema.
+if [ "${SKIP_MIGRATIONS}" = "1" ]; then
+    echo "Skipping schema migrations (SKIP_MIGRATIONS=1)"
+elif [ -z "${DOPPLER_TOKEN}" ] && [ -z "${DATABASE_URL}" ]; then
+    echo "Error: pass a Doppler token or set DATABASE_URL to run schema migrations (or SKIP_MIGRATIONS=1)"
+    exit 1
+else
+    echo "Applying schema migrations..."
+    python3 -m venv .migrate-venv
+    .migrate-venv/bin/pip install --quiet -r requirements.txt
+    DOPPLER_TOKEN=${DOPPLER_TOKEN} ENVIRONMENT=${ENVIRONMENT} .migrate-venv/bin/python src/migrations.py
+    rm -rf .migrate-venv
+fi
+
 # Deploy CloudFormation stack
 echo "Deploying CloudFormation stack..."
 aws cloudformation deploy \
@@ -1,38 +1,75 @@
+import hashlib
+import io
 import json
 import logging
 import os
-from typing import Dict, Any
+from typing import Any, Dict, NamedTuple, Optional
 
-from config import Config
-from database import init_db
-from services.amortization_service import repayment_plan, get_user_amortization
-from services.register_survey_service import register_survey_method
-from services.non_defaulter_service import create_non_defaulter, get_all_non_defaulters
-from services.clustered_survey_service import register_clustered_survey
+from router import ANY_METHOD, Router
+from structured_logging import configure_logging, request_scope
+from instrumentation import metrics_scope, stage, timed
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Initialize database connection
-db = init_db()
+COLUMNAR_MEDIA_TYPE = 'application/vnd.score-handler.columnar+json'
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+# Cache-Control for responses carrying an ETag. Both hold user data (plans, user IDs and
+# psychometric scores): only the client may cache them, and it revalidates every time (a 304
+# costs one indexed lookup or aggregate). Shared caching (e.g. 'public, s-maxage=30') is an
+# explicit opt-in through the env var, and only safe behind an authorizing edge.
+REPAYMENT_PLAN_CACHE_CONTROL = os.environ.get('REPAYMENT_PLAN_CACHE_CONTROL', 'private, no-cache')
+NON_DEFAULTERS_CACHE_CONTROL = os.environ.get('NON_DEFAULTERS_CACHE_CONTROL', 'private, no-cache')
+
+# 'lazy' (default): SQLAlchemy, models and services are imported by the first request that needs
+# them. 'eager': pay for everything in the init phase (e.g. under provisioned concurrency)
+COLD_START_MODE = os.environ.get('COLD_START_MODE', 'lazy')
+EAGER_MODULES = (
+    'services.register_survey_service',
+    'services.clustered_survey_service',
+    'services.non_defaulter_service',
+    'services.amortization_service',
+)
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     AWS Lambda handler for score-handler service
     """
-    try:
-        http_method, path, body, path_parameters, headers, origin = parse_event(event)
-        logger.info(f"Request: {http_method} {path}")
+    request_id = getattr(context, 'aws_request_id', None) or event.get('requestContext', {}).get('requestId')
+    # One structured summary record per request (method, route, status, duration_ms, ...)
+    # and one EMF line with per-stage durations, DB round trips and payload sizes
+    with request_scope(request_id, logger) as summary, metrics_scope(requestId=request_id) as metrics:
+        response = handle_event(event, summary)
+        summary['status'] = response['statusCode']
+        metrics.dimensions['Route'] = f"{summary.get('method')} {summary.get('route') or 'unmatched'}"
+        metrics.properties['statusCode'] = response['statusCode']
+        metrics.count('request_bytes', len(event.get('body') or ''), 'Bytes')
+        metrics.count('response_bytes', len(response['body']), 'Bytes')
+        return response
 
-        request_data = parse_json_body(body, origin)
+def handle_event(event: Dict[str, Any], summary: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        with stage('parse'):
+            http_method, path, body, path_parameters, headers, origin = parse_event(event)
+            query_parameters = event.get('queryStringParameters') or {}
+            summary.update(method=http_method, path=path)
+            request_data = parse_json_body(body, origin)
         if isinstance(request_data, dict) and request_data.get('error'):
             return create_response(400, request_data, origin)
 
         if http_method == 'OPTIONS':
             return create_response(200, {}, origin)
 
-        return handle_route(http_method, path, request_data, path_parameters, origin)
+        route, route_parameters = router.match(http_method, path)
+        summary['route'] = route.template if route else None
+        request = Request(http_method, path, request_data,
+                          # API Gateway's pathParameters win over the ones parsed from the template
+                          {**route_parameters, **path_parameters}, query_parameters, headers, origin,
+                          columnar=wants_columnar(query_parameters, headers))
+        with stage('handler'):
+            return handle_route(request, route)
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}", exc_info=True)
         return create_response(500, {'error': 'Internal server error'}, None)
@@ -54,42 +91,173 @@ def parse_json_body(body, origin):
     except json.JSONDecodeError:
         return {'error': 'Invalid JSON in request body'}
 
-def handle_route(http_method, path, request_data, path_parameters, origin):
-    if path in ['/health', '/']:
-        return create_response(200, {'status': 'healthy', 'service': 'score-handler'}, origin)
+def requested_format(query_parameters):
+    """?format= value, or None. A repeated parameter arrives as a list (v1 multi-value events) or
+    comma-joined (API Gateway v2); either way the first value wins"""
+    fmt = query_parameters.get('format')
+    if isinstance(fmt, list):
+        fmt = fmt[0] if fmt else None
+    if isinstance(fmt, str):
+        fmt = fmt.split(',')[0].strip()
+    return fmt or None
+
+def wants_columnar(query_parameters, headers):
+    """Opt-in columnar tables via ?format=columnar or an Accept header naming the columnar media type"""
+    if requested_format(query_parameters) == 'columnar':
+        return True
+    accept = headers.get('accept') or headers.get('Accept') or ''
+    return COLUMNAR_MEDIA_TYPE in accept
+
+def wants_ndjson(query_parameters, headers):
+    """NDJSON export via ?format=ndjson or Accept: application/x-ndjson"""
+    if requested_format(query_parameters) == 'ndjson':
+        return True
+    accept = headers.get('accept') or headers.get('Accept') or ''
+    return NDJSON_MEDIA_TYPE in accept
+
+def make_etag(*parts):
+    """Strong ETag: a digest of everything the representation is derived from"""
+    return '"' + hashlib.sha256('|'.join(map(str, parts)).encode('utf-8')).hexdigest()[:32] + '"'
+
+def etag_matches(headers, etag):
+    """If-None-Match uses weak comparison: W/ prefixes are ignored, '*' matches anything"""
+    if_none_match = headers.get('if-none-match') or headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in (tag[2:] if tag.startswith('W/') else tag for tag in candidates)
+
+def cache_headers(etag, cache_control):
+    # The body depends on Accept (columnar/NDJSON) and the CORS headers on Origin
+    return {'ETag': etag, 'Cache-Control': cache_control, 'Vary': 'Accept, Origin'}
+
+def not_modified(etag, cache_control, origin):
+    return create_response(304, '', origin, extra_headers=cache_headers(etag, cache_control))
+
+def list_non_defaulters_route(query_parameters, headers, origin, session=None):
+    """Keyset-paginated GET /non-defaulters; the next page's cursor goes in X-Next-Cursor.
+
+    The ETag is computed from the page's (count, max nrow, row version sum) before the rows are
+    read, so a matching If-None-Match gets a 304 without fetching or encoding the page.
+    """
+    from services.non_defaulter_service import (list_non_defaulters, export_non_defaulters, page_fingerprint,
+                                               parse_page_params, MAX_PAGE_SIZE, MAX_EXPORT_ROWS)
+    ndjson = wants_ndjson(query_parameters, headers)
+    try:
+        after, limit, fields = parse_page_params(query_parameters, MAX_EXPORT_ROWS if ndjson else MAX_PAGE_SIZE)
+    except ValueError as e:
+        return create_response(400, {'error': str(e)}, origin)
+
+    etag = make_etag(after, limit, ','.join(fields), 'ndjson' if ndjson else 'json',
+                     *page_fingerprint(session, after, limit))
+    if etag_matches(headers, etag):
+        return not_modified(etag, NON_DEFAULTERS_CACHE_CONTROL, origin)
+    response_headers = cache_headers(etag, NON_DEFAULTERS_CACHE_CONTROL)
+
+    if ndjson:
+        out = io.StringIO()
+        written, last = export_non_defaulters(out, session, after, limit, fields)
+        if written == limit:
+            response_headers['X-Next-Cursor'] = str(last)
+        return create_response(200, out.getvalue(), origin, content_type=NDJSON_MEDIA_TYPE,
+                               extra_headers=response_headers)
+
+    result, next_cursor = list_non_defaulters(session, after, limit, fields)
+    if isinstance(result, dict):
+        return create_response(500, result, origin)
+    if next_cursor:
+        response_headers['X-Next-Cursor'] = str(next_cursor)
+    return create_response(200, result, origin, extra_headers=response_headers)
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    data: Any
+    path_parameters: Dict[str, str]
+    query_parameters: Dict[str, Any]
+    headers: Dict[str, str]
+    origin: Optional[str]
+    session: Any = None
+    columnar: bool = False
+
+# Handlers import their service module on first call, so a container only pays for the routes it serves
+router = Router()
+
+@router.route(ANY_METHOD, '/', needs_db=False)
+@router.route(ANY_METHOD, '/health', needs_db=False)
+def health(request):
+    return create_response(200, {'status': 'healthy', 'service': 'score-handler'}, request.origin)
+
+@router.route('POST', '/survey')
+def post_survey(request):
+    from services.register_survey_service import register_survey_method
+    return create_response(200, register_survey_method(request.data, request.session), request.origin)
 
-    if path == '/survey' and http_method == 'POST':
-        result = register_survey_method(request_data)
-        return create_response(200, result, origin)
+@router.route('POST', '/survey/batch')
+def post_survey_batch(request):
+    from services.register_survey_service import register_survey_batch
+    result = register_survey_batch(request.data, request.session)
+    return create_response(400 if 'error' in result else 200, result, request.origin)
 
-    if path == '/clustered-score' and http_method == 'POST':
-        result = register_clustered_survey(request_data)
-        return create_response(200, result, origin)
+@router.route('POST', '/clustered-score')
+def post_clustered_score(request):
+    from services.clustered_survey_service import register_clustered_survey
+    return create_response(200, register_clustered_survey(request.data, request.session), request.origin)
 
-    if path == '/non-defaulters':
-        if http_method == 'POST':
-            result = create_non_defaulter(request_data)
-            return create_response(201, result, origin)
-        if http_method == 'GET':
-            result = get_all_non_defaulters()
-            return create_response(200, result, origin)
+@router.route('POST', '/non-defaulters')
+def post_non_defaulter(request):
+    from services.non_defaulter_service import create_non_defaulter
+    return create_response(201, create_non_defaulter(request.data, request.session), request.origin)
 
-    if path == '/repayment-plan' and http_method == 'POST':
-        result = repayment_plan(request_data)
-        return create_response(200, result, origin)
+@router.route('GET', '/non-defaulters')
+def get_non_defaulters(request):
+    return list_non_defaulters_route(request.query_parameters, request.headers, request.origin, request.session)
 
-    if path.startswith('/repayment-plan/') and http_method == 'GET':
-        user_id = path_parameters.get('user_id') or path.split('/')[-1]
-        result, status_code = get_user_amortization(user_id)
-        return create_response(status_code, result, origin)
+@router.route('POST', '/repayment-plan')
+def post_repayment_plan(request):
+    from services.amortization_service import repayment_plan
+    return create_response(200, repayment_plan(request.data, request.session, request.columnar), request.origin)
 
-    logger.warning(f"No route found for {http_method} {path}")
-    return create_response(404, {'error': f'Endpoint not found: {http_method} {path}'}, origin)
+@router.route('POST', '/repayment-plan/batch')
+def post_repayment_plan_batch(request):
+    from services.amortization_service import repayment_plan_batch
+    return create_response(200, repayment_plan_batch(request.data, request.session, request.columnar), request.origin)
 
-def create_response(status_code: int, body: Dict[str, Any], origin: str = None) -> Dict[str, Any]:
-    """Create a properly formatted API Gateway response"""
+@router.route('GET', '/repayment-plan/{user_id}')
+def get_repayment_plan(request):
+    from services.amortization_service import get_plan_input_hash, get_user_amortization
+    user_id = request.path_parameters['user_id']
+    # The stored inputHash identifies the plan: revalidation reads one column, never the schedule
+    if request.headers.get('if-none-match') or request.headers.get('If-None-Match'):
+        input_hash = get_plan_input_hash(user_id, request.session)
+        if input_hash:
+            etag = make_etag(input_hash, 'columnar' if request.columnar else 'rows')
+            if etag_matches(request.headers, etag):
+                return not_modified(etag, REPAYMENT_PLAN_CACHE_CONTROL, request.origin)
+
+    result, status_code, input_hash = get_user_amortization(user_id, request.session, request.columnar)
+    if status_code != 200 or not input_hash:
+        return create_response(status_code, result, request.origin)
+    etag = make_etag(input_hash, 'columnar' if request.columnar else 'rows')
+    return create_response(status_code, result, request.origin,
+                           extra_headers=cache_headers(etag, REPAYMENT_PLAN_CACHE_CONTROL))
+
+def handle_route(request, route):
+    if route is None:
+        logger.warning(f"No route found for {request.method} {request.path}")
+        return create_response(404, {'error': f'Endpoint not found: {request.method} {request.path}'}, request.origin)
+    if not route.needs_db:
+        return route.handler(request)
+    from database import session_scope
+    # One unit of work per request: a single connection checkout and one commit
+    with session_scope() as session:
+        return route.handler(request._replace(session=session))
+
+def create_response(status_code: int, body: Any, origin: str = None, content_type: str = 'application/json',
+                    extra_headers: Dict[str, str] = None) -> Dict[str, Any]:
+    """Create a properly formatted API Gateway response; str bodies are sent as-is"""
     headers = {
-        'Content-Type': 'application/json',
+        'Content-Type': content_type,
         'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
         'Access-Control-Allow-Headers': 'Content-Type, Authorization, Origin'
     }
@@ -98,9 +266,27 @@ def create_response(status_code: int, body: Dict[str, Any], origin: str = None)
     if origin and origin in ['http://localhost:3000', 'http://localhost:5173', 'https://loan-client.onrender.com']:
         headers['Access-Control-Allow-Origin'] = origin
         headers['Access-Control-Allow-Credentials'] = 'true'
+    if extra_headers:
+        headers.update(extra_headers)
+        headers['Access-Control-Expose-Headers'] = ', '.join(extra_headers)
     
     return {
         'statusCode': status_code,
         'headers': headers,
-        'body': json.dumps(body)
-    }
\ No newline at end of file
+        'body': body if isinstance(body, str) else serialize(body)
+    }
+
+@timed('serialize')
+def serialize(body):
+    return json.dumps(body, separators=(',', ':'))
+
+def warm_up():
+    """Build the engine and import every route's service module ahead of the first request"""
+    import importlib
+    from database import init_db
+    init_db()
+    for module in EAGER_MODULES:
+        importlib.import_module(module)
+
+if COLD_START_MODE == 'eager':
+    warm_up()
@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from instrumentation import count, stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 60
+
+# Distinguishes "not cached" from a cached falsy value
+MISSING = object()
+
+
+class CacheBackend:
+    """Interface for a cache shared between containers (e.g. Redis or Memcached).
+
+    Values must be JSON-serializable; implementations handle their own expiry.
+    """
+
+    def get(self, key):
+        """Cached value or MISSING"""
+        raise NotImplementedError
+
+    def set(self, key, value, ttl_seconds):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+
+class InMemoryBackend(CacheBackend):
+    """Process-local stand-in for a shared backend, for local runs and benchmarks"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value, expires_at = self._entries.get(key, (MISSING, None))
+            if value is not MISSING and time.monotonic() >= expires_at:
+                del self._entries[key]
+                return MISSING
+            return value
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl_seconds)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after ttl_seconds.
+
+    Reads go local cache -> shared backend (if any) -> loader; None results are not cached,
+    so a user who has not submitted a survey yet is looked up again next time.
+    Hits and misses are counted as <name>_cache_hits/_misses and miss latency is the
+    <name>_cache_miss stage in the request's metrics.
+    """
+
+    def __init__(self, name, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS, backend=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, loader):
+        value = self._get_local(key)
+        if value is MISSING and self.backend is not None:
+            value = self.backend.get(self._backend_key(key))
+            if value is not MISSING:
+                self._set_local(key, value)
+        if value is not MISSING:
+            self.hits += 1
+            count(f'{self.name}_cache_hits')
+            return value
+
+        self.misses += 1
+        count(f'{self.name}_cache_misses')
+        with stage(f'{self.name}_cache_miss'):
+            value = loader()
+        if value is not None:
+            self._set_local(key, value)
+            if self.backend is not None:
+                self.backend.set(self._backend_key(key), value, self.ttl_seconds)
+        return value
+
+    def invalidate(self, *keys):
+        """Drop keys here and in the shared backend; call once the write to the underlying rows has committed"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.backend is not None:
+            for key in keys:
+                self.backend.delete(self._backend_key(key))
+
+    def clear(self):
+        """Drop every local entry (the shared backend expires on its own)"""
+        with self._lock:
+            self._entries.clear()
+
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _backend_key(self, key):
+        return f'{self.name}:{key}'
+
+    def _get_local(self, key):
+        with self._lock:
+            value, expires_at = self._entries.get(key, (MISSING, None))
+            if value is MISSING:
+                return MISSING
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def cache_from_env(name, prefix):
+    """TTLCache configured by <prefix>_CACHE_SIZE, _CACHE_TTL_SECONDS and _CACHE_BACKEND (none|memory).
+
+    A size or TTL of 0 disables local caching: every lookup goes to the loader.
+    """
+    max_entries = int(os.environ.get(f'{prefix}_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+    ttl_seconds = float(os.environ.get(f'{prefix}_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+    backend_name = os.environ.get(f'{prefix}_CACHE_BACKEND', 'none')
+    backend = InMemoryBackend() if backend_name == 'memory' else None
+    if backend_name not in ('none', 'memory'):
+        logger.warning(f"Unknown {prefix}_CACHE_BACKEND '{backend_name}', using the local cache only")
+    return TTLCache(name, max_entries, ttl_seconds, backend)
+
+
+# user_score.risk_level by userId; read by the repayment-plan path, invalidated by survey writes
+user_risk_cache = cache_from_env('user_risk', 'USER_RISK')
@@ -1,28 +1,12 @@
-import os
-import requests
-import json
 import logging
+import os
+from secrets_provider import get_secrets_provider
 
 logger = logging.getLogger(__name__)
 
 def get_doppler_secret(key, default=None):
-    """Get secret from Doppler API"""
-    token = os.environ.get('DOPPLER_TOKEN')
-    if not token:
-        return default
-    
-    try:
-        response = requests.get(
-            'https://api.doppler.com/v3/configs/config/secrets/download',
-            headers={'Authorization': f'Bearer {token}'},
-            params={'format': 'json'}
-        )
-        response.raise_for_status()
-        secrets = response.json()
-        return secrets.get(key, default)
-    except Exception as e:
-        logger.error(f"Error getting Doppler secret {key}: {e}")
-        return default
+    """Get secret from the cached Doppler bundle (fetched once per TTL, not per read)"""
+    return get_secrets_provider().get(key, default)
 
 class Config:
     # Supabase PostgreSQL connection with SSL
@@ -41,7 +25,7 @@ class Config:
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 300,  # 5min for Lambda lifecycle
-        'pool_size': 1,       # Single connection for Lambda
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 1)),  # Single connection for Lambda; the local server raises it
         'max_overflow': 0,    # No overflow in serverless
         'connect_args': {
             'connect_timeout': 10,
@@ -49,4 +33,18 @@ class Config:
             'sslmode': 'require'  # Force SSL connection
         }
     }
-    
\ No newline at end of file
+    
+    @staticmethod
+    def engine_options(database_uri):
+        """Engine options for a URL: the Supabase settings above, or SQLite for local benchmarks"""
+        options = {key: value for key, value in Config.SQLALCHEMY_ENGINE_OPTIONS.items() if key != 'connect_args'}
+        if database_uri.startswith('sqlite'):
+            # Threaded local servers share pooled connections across threads
+            options['connect_args'] = {'check_same_thread': False}
+            return options
+        connect_args = dict(Config.SQLALCHEMY_ENGINE_OPTIONS['connect_args'])
+        if 'sslmode=' in database_uri:
+            # An explicit sslmode in the URL wins (e.g. a local Postgres stand-in without SSL)
+            connect_args.pop('sslmode')
+        options['connect_args'] = connect_args
+        return options
@@ -1,45 +1,178 @@
-from sqlalchemy import create_engine
+import logging
+import os
+import threading
+from contextlib import contextmanager
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
 from config import Config
+from instrumentation import stage, current_metrics
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 engine = None
 SessionLocal = None
+# Unpooled engine for background work (risk model refits), so it never takes the request pool's connection
+BackgroundSessionLocal = None
+schema_checked = False
+# Engine creation and the schema check run once even when a threaded server races on the first requests
+_init_lock = threading.Lock()
+
+def get_schema_mode():
+    """Schema bootstrap mode: 'none' (trust migrations), 'check' (one version SELECT) or 'create' (legacy DDL)"""
+    mode = os.environ.get('SCHEMA_BOOTSTRAP')
+    if mode:
+        return mode
+    return 'none' if os.environ.get('ENVIRONMENT') == 'prod' else 'check'
+
+def register_models():
+    """Import models to register them with Base"""
+    from models.user_score import UserScore
+    from models.user_amortization_data import UserAmortizationData
+    from models.non_defaulter import NonDefaulter
+    from models.schema_version import SchemaVersion
 
 def init_db():
-    """Initialize database connection for Lambda"""
+    """Initialize database connection for Lambda (no DDL, no round trips)"""
     global engine, SessionLocal
-    
-    if engine is None:
-        config = Config()
-        engine = create_engine(
-            config.SQLALCHEMY_DATABASE_URI,
-            **Config.SQLALCHEMY_ENGINE_OPTIONS
-        )
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        
-        # Import models to register them with Base
-        from models.user_score import UserScore
-        from models.user_amortization_data import UserAmortizationData
-        from models.non_defaulter import NonDefaulter
-        
-        # Create tables if they don't exist
-        Base.metadata.create_all(bind=engine)
-        
-        # Ensure user_amortization_data table exists with correct schema
-        from models.user_amortization_data import UserAmortizationData
-        UserAmortizationData.__table__.create(bind=engine, checkfirst=True)
-    
+
+    with _init_lock, stage('db_init'):
+        if engine is None:
+            database_uri = Config().SQLALCHEMY_DATABASE_URI
+            engine = create_engine(
+                database_uri,
+                **Config.engine_options(database_uri)
+            )
+            instrument_engine(engine)
+            SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            register_models()
+
     return SessionLocal
 
+def instrument_engine(engine):
+    """Count every statement as a DB round trip and add its time to the request's 'db' stage"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_started'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.add_stage('db', (time.perf_counter() - conn.info.pop('query_started')) * 1000)
+            metrics.count('db_round_trips')
+
+def ensure_schema():
+    """Lazily verify the schema once per container, on first session checkout"""
+    global schema_checked
+    if schema_checked:
+        return
+
+    from migrations import check_schema_version, migrate
+    with _init_lock, stage('db_schema'):
+        if schema_checked:
+            return
+        mode = get_schema_mode()
+        if mode == 'create':
+            migrate(engine)
+        elif mode == 'check' and not check_schema_version(engine):
+            migrate(engine)
+        schema_checked = True
+
 def get_db_session():
     """Get database session"""
     if SessionLocal is None:
         init_db()
+    ensure_schema()
     return SessionLocal()
 
+def get_background_session():
+    """Session on its own connection, opened on checkout and closed with the session.
+
+    The Lambda pool holds a single connection (pool_size=1, max_overflow=0); a background
+    thread scanning a table on it would make the next request's checkout wait for the scan.
+    """
+    global BackgroundSessionLocal
+    if SessionLocal is None:
+        init_db()
+    ensure_schema()
+    with _init_lock:
+        if BackgroundSessionLocal is None:
+            options = {key: value for key, value in Config.engine_options(str(engine.url)).items()
+                       if key not in ('pool_size', 'max_overflow', 'pool_recycle')}
+            background_engine = create_engine(engine.url, poolclass=NullPool, **options)
+            instrument_engine(background_engine)
+            BackgroundSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=background_engine)
+    return BackgroundSessionLocal()
+
+def on_commit(session, callback):
+    """Run callback() once session's outermost transaction commits; dropped if it rolls back.
+
+    For side effects that must not outlive a rolled-back write (cache invalidation, model updates):
+    run before the commit, a concurrent reader could repopulate them from the old rows.
+    """
+    if not session.in_transaction():
+        # Tie the callback to a transaction: rolling back one that never began fires no event
+        session.begin()
+    session.info.setdefault('on_commit', []).append(callback)
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(session):
+    # Also fires when a savepoint is released; the session is then still inside that savepoint
+    if session.in_nested_transaction():
+        return
+    for callback in session.info.pop('on_commit', []):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Post-commit callback failed: {str(e)}", exc_info=True)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_on_commit(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop('on_commit', None)
+
 def close_db_session(session):
     """Close database session"""
     if session:
-        session.close()
\ No newline at end of file
+        session.close()
+
+@contextmanager
+def session_scope(session=None, background=False):
+    """Unit of work: reuse the caller's session, or open one that commits once on exit.
+
+    background=True opens it on a dedicated unpooled connection (see get_background_session).
+    """
+    if session is not None:
+        yield session
+        return
+
+    with stage('db_checkout'):
+        session = get_background_session() if background else get_db_session()
+    try:
+        yield session
+        with stage('db_commit'):
+            session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        close_db_session(session)
+
+def upsert(session, model, rows, index_elements=('userId',), returning=True):
+    """One round trip INSERT ... ON CONFLICT (index_elements) DO UPDATE [RETURNING] for a list of rows"""
+    if session.get_bind().dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+
+    stmt = insert(model).values(rows)
+    update_cols = {key: stmt.excluded[key] for key in rows[0] if key not in index_elements}
+    stmt = stmt.on_conflict_do_update(index_elements=list(index_elements), set_=update_cols)
+    if not returning:
+        session.execute(stmt)
+        return None
+    return session.scalars(stmt.returning(model), execution_options={'populate_existing': True}).all()
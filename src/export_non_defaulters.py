@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Full NDJSON export of non_defaulters, streamed off a server-side cursor.
+Run with: python src/export_non_defaulters.py [--fields userId,riskLevel] [--after 0] [-o out.ndjson]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.non_defaulter_service import export_non_defaulters, parse_page_params
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fields', help='comma-separated API field names (default: all)')
+    parser.add_argument('--after', type=int, default=0, help='only rows with nrow greater than this')
+    parser.add_argument('-o', '--output', help='output file (default: stdout)')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    try:
+        after, _, fields = parse_page_params({'after': args.after, 'fields': args.fields})
+    except ValueError as e:
+        print(f"❌ {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        written, last = export_non_defaulters(out, after=after, fields=fields)
+    finally:
+        if args.output:
+            out.close()
+    print(f"✅ Exported {written} non-defaulters (last nrow: {last})", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Bulk import of partner-campaign surveys into user_score.
+Run with: python src/import_surveys.py surveys.jsonl [--chunk-size 500]
+Input is JSONL (one survey per line) or a JSON array of surveys, as POSTed to /survey.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.register_survey_service import register_survey_batch, DEFAULT_BATCH_CHUNK_SIZE
+
+def read_surveys(path):
+    with open(path) as f:
+        content = f.read()
+    if content.lstrip().startswith('['):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', help='JSONL file or JSON array of surveys')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_BATCH_CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    surveys = read_surveys(args.input)
+    start = time.perf_counter()
+    result = register_survey_batch(surveys, chunk_size=args.chunk_size)
+    seconds = time.perf_counter() - start
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        sys.exit(1)
+
+    for index, item in enumerate(result['results']):
+        if 'error' in item:
+            print(f"  survey {index}: {item['error']}")
+    print(f"✅ Imported {result['written']} of {len(surveys)} surveys in {seconds:.2f}s "
+          f"({len(surveys) / seconds:.0f} surveys/s, {result['failed']} failed)")
+    if result['failed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
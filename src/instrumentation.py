@@ -0,0 +1,114 @@
+import contextvars
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ScoreHandler')
+
+# Metrics of the request being handled on this thread/context; None outside requests
+_current = contextvars.ContextVar('metrics', default=None)
+_cold_start = True
+
+def _write_stdout(line):
+    # EMF must reach stdout as a raw JSON line, not wrapped by the log formatter
+    sys.stdout.write(line + '\n')
+    sys.stdout.flush()
+
+_sink = _write_stdout
+
+class RequestMetrics:
+    """Per-stage durations (ms), counters and dimensions for one request"""
+
+    def __init__(self, cold_start, properties):
+        self.started = time.perf_counter()
+        self.cold_start = cold_start
+        self.stages = {}
+        self.counters = {'db_round_trips': (0, 'Count')}
+        self.dimensions = {}
+        self.properties = properties
+
+    def add_stage(self, name, ms):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def count(self, name, value=1, unit='Count'):
+        previous, _ = self.counters.get(name, (0, unit))
+        self.counters[name] = (previous + value, unit)
+
+    def to_emf(self):
+        """CloudWatch Embedded Metric Format: one JSON object with its metric directives"""
+        values = {f'{name}_ms': round(ms, 3) for name, ms in self.stages.items()}
+        units = {name: 'Milliseconds' for name in values}
+        for name, (value, unit) in self.counters.items():
+            values[name], units[name] = value, unit
+        values['cold_start'], units['cold_start'] = int(self.cold_start), 'Count'
+        return json.dumps({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [sorted(self.dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': unit} for name, unit in units.items()]
+                }]
+            },
+            **self.dimensions,
+            **self.properties,
+            **values
+        }, default=str, separators=(',', ':'))
+
+def metrics_enabled():
+    return os.environ.get('METRICS_ENABLED', 'true').lower() != 'false'
+
+def current_metrics():
+    return _current.get()
+
+@contextmanager
+def metrics_scope(**properties):
+    """Collect metrics for one request and emit them as a single EMF line on exit"""
+    global _cold_start
+    metrics = RequestMetrics(_cold_start, {key: value for key, value in properties.items() if value is not None})
+    _cold_start = False
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        metrics.add_stage('duration', (time.perf_counter() - metrics.started) * 1000)
+        _current.reset(token)
+        if metrics_enabled():
+            _sink(metrics.to_emf())
+
+@contextmanager
+def stage(name):
+    """Time a block into the current request's stage (repeated stages accumulate); no-op outside requests"""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_stage(name, (time.perf_counter() - start) * 1000)
+
+def timed(name):
+    """Decorator form of stage"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name, value=1, unit='Count'):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, value, unit)
+
+def set_sink(sink):
+    """Route EMF lines somewhere other than stdout (e.g. a list's append in a local check); returns the old sink"""
+    global _sink
+    previous, _sink = _sink, sink
+    return previous
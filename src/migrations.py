@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+One-shot schema migration for score-handler.
+Run before deploying a new schema version with: python src/migrations.py
+"""
+
+import logging
+import os
+import sys
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import Base, init_db, register_models
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a model/table changes; containers in 'check' mode migrate lazily on mismatch
+SCHEMA_VERSION = 5
+
+def check_schema_version(engine):
+    """Single SELECT against schema_version; False if missing or outdated"""
+    from models.schema_version import SchemaVersion
+    try:
+        with engine.connect() as conn:
+            current = conn.execute(select(SchemaVersion.version).order_by(SchemaVersion.version.desc()).limit(1)).scalar()
+        return current is not None and current >= SCHEMA_VERSION
+    except SQLAlchemyError as e:
+        logger.info(f"Schema version check failed, migration needed: {str(e)}")
+        return False
+
+def add_missing_columns(conn):
+    """create_all never alters existing tables; add new nullable model columns in place"""
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {col['name'] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                logger.info(f"Adding column {table.name}.{column.name}")
+                conn.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                                  f"{column.type.compile(dialect=conn.dialect)}"))
+
+# non_defaulters.rowVersion must change on every UPDATE, including ORM flushes, console edits and
+# data migrations, or GET /non-defaulters would keep answering 304 for changed pages
+ROW_VERSION_TRIGGERS = {
+    'postgresql': [
+        '''CREATE OR REPLACE FUNCTION non_defaulters_bump_row_version() RETURNS trigger AS $$
+           BEGIN
+               NEW."rowVersion" := COALESCE(OLD."rowVersion", 1) + 1;
+               RETURN NEW;
+           END $$ LANGUAGE plpgsql''',
+        'DROP TRIGGER IF EXISTS non_defaulters_row_version ON non_defaulters',
+        '''CREATE TRIGGER non_defaulters_row_version BEFORE UPDATE ON non_defaulters
+           FOR EACH ROW EXECUTE FUNCTION non_defaulters_bump_row_version()''',
+    ],
+    # SQLite cannot assign NEW in a trigger; the nested UPDATE does not re-fire it (recursive_triggers is off)
+    'sqlite': [
+        '''CREATE TRIGGER IF NOT EXISTS non_defaulters_row_version AFTER UPDATE ON non_defaulters
+           FOR EACH ROW BEGIN
+               UPDATE non_defaulters SET "rowVersion" = COALESCE(OLD."rowVersion", 1) + 1 WHERE nrow = NEW.nrow;
+           END''',
+    ],
+}
+
+def install_triggers(conn):
+    statements = ROW_VERSION_TRIGGERS.get(conn.dialect.name)
+    if statements is None:
+        logger.warning(f"No rowVersion trigger for {conn.dialect.name}; non-defaulter ETags will miss updates")
+        return
+    for statement in statements:
+        conn.execute(text(statement))
+
+def migrate(engine):
+    """Create missing tables/columns and record the current schema version"""
+    register_models()
+    from models.schema_version import SchemaVersion
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        add_missing_columns(conn)
+        install_triggers(conn)
+        exists = conn.execute(select(SchemaVersion.version).where(SchemaVersion.version == SCHEMA_VERSION)).first()
+        if not exists:
+            conn.execute(SchemaVersion.__table__.insert().values(version=SCHEMA_VERSION))
+    logger.info(f"Schema migrated to version {SCHEMA_VERSION}")
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    import database
+    migrate(database.engine)
+    print(f"✅ Schema at version {SCHEMA_VERSION}")
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric
+from sqlalchemy import Column, Integer, String, Numeric, Date, Text
 from database import Base
 
 class UserAmortizationData(Base):
@@ -10,6 +10,10 @@ class UserAmortizationData(Base):
     instalment = Column(Numeric(15, 2))
     period = Column(Numeric(12, 6))
     amount = Column(Numeric(15, 2))
+    # Generated plan stored at write time (compact columnar JSON) so reads never recompute
+    schedule = Column(Text)
+    originDate = Column(Date)
+    inputHash = Column(String(64))
 
     def to_dict(self):
         return {
@@ -17,5 +21,6 @@ class UserAmortizationData(Base):
             'userRisk': float(self.userRisk) if self.userRisk else None,
             'instalment': float(self.instalment) if self.instalment else None,
             'period': float(self.period) if self.period else None,
-            'amount': float(self.amount) if self.amount else None
-        }
\ No newline at end of file
+            'amount': float(self.amount) if self.amount else None,
+            'originDate': self.originDate.isoformat() if self.originDate else None
+        }
@@ -18,6 +18,10 @@ class UserScore(Base):
     familismo = Column(Numeric(10, 6))
     respect = Column(Numeric(10, 6))
     risk_level = Column(Numeric(10, 6))
+    # Written by the bulk re-scoring job against the clustered risk model
+    risk_distance = Column(Numeric(10, 4))
+    risk_score = Column(Numeric(6, 2))
+    closest_cluster = Column(Integer)
 
     def to_dict(self):
         return {
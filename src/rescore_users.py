@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Nightly bulk re-scoring of user_score against the clustered risk model.
+Run after a model refresh with: python src/rescore_users.py [--chunk-size 5000]
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.bulk_risk_service import rescore_users, DEFAULT_CHUNK_SIZE
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    result = rescore_users(chunk_size=args.chunk_size)
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        sys.exit(1)
+    print(f"✅ Re-scored {result['rows']} users in {result['seconds']}s ({result['rows_per_second']} rows/s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import re
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+ANY_METHOD = '*'
+PARAM_PATTERN = re.compile(r'\{(\w+)\}')
+
+def compile_template(template):
+    """Anchored regex for a path template, one named group per {param} (single segment)"""
+    parts = PARAM_PATTERN.split(template)  # literal, name, literal, name, ...
+    pattern = ''.join(re.escape(part) if i % 2 == 0 else f'(?P<{part}>[^/]+)' for i, part in enumerate(parts))
+    return re.compile(f'^{pattern}$')
+
+class Route(NamedTuple):
+    method: str
+    template: str
+    handler: Callable
+    # Routes that never touch the database skip session checkout entirely
+    needs_db: bool = True
+
+class Router:
+    """Route table compiled once at import: static paths are one dict lookup, templated
+    paths (e.g. /repayment-plan/{user_id}) are tried in registration order as regexes."""
+
+    def __init__(self):
+        self.static: Dict[Tuple[str, str], Route] = {}
+        self.dynamic = []
+
+    def add(self, method, template, handler, needs_db=True):
+        route = Route(method, template, handler, needs_db)
+        if PARAM_PATTERN.search(template):
+            self.dynamic.append((method, compile_template(template), route))
+        else:
+            self.static[(method, template)] = route
+        return route
+
+    def route(self, method, template, needs_db=True):
+        """Decorator form of add"""
+        def register(handler):
+            self.add(method, template, handler, needs_db)
+            return handler
+        return register
+
+    def match(self, method, path) -> Tuple[Optional[Route], Dict[str, Any]]:
+        """(route, path parameters) for a request, or (None, {}) if nothing matches"""
+        route = self.static.get((method, path)) or self.static.get((ANY_METHOD, path))
+        if route:
+            return route, {}
+        for route_method, pattern, route in self.dynamic:
+            if route_method in (method, ANY_METHOD):
+                found = pattern.match(path)
+                if found:
+                    return route, found.groupdict()
+        return None, {}
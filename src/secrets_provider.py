@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+import time
+from instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+DOPPLER_SECRETS_URL = 'https://api.doppler.com/v3/configs/config/secrets/download'
+DEFAULT_TTL_SECONDS = 300     # Re-fetch at most every 5min per container
+DEFAULT_TIMEOUT_SECONDS = 3   # Never block a cold start on a slow Doppler call
+RETRY_SECONDS = 30            # After a failed refresh, serve the last good bundle and retry this soon
+
+
+class SecretsUnavailableError(RuntimeError):
+    """Doppler is configured but unreachable and there is no bundle to fall back on"""
+
+
+class SecretsProvider:
+    """Fetches the secrets bundle once and serves every key from an in-process TTL cache.
+
+    Sources, in order: Doppler API (when DOPPLER_TOKEN is set), a local JSON file
+    (SECRETS_FILE), then process environment variables for any key not in the bundle.
+    """
+
+    def __init__(self, ttl_seconds=None, timeout=None):
+        self.ttl_seconds = float(ttl_seconds if ttl_seconds is not None
+                                 else os.environ.get('SECRETS_TTL_SECONDS', DEFAULT_TTL_SECONDS))
+        self.timeout = float(timeout if timeout is not None
+                             else os.environ.get('DOPPLER_TIMEOUT', DEFAULT_TIMEOUT_SECONDS))
+        self._secrets = None
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        self.source = None
+        self.last_fetch_ms = None
+        self.fetch_count = 0
+
+    def get(self, key, default=None):
+        secrets = self._get_bundle()
+        if key in secrets:
+            return secrets[key]
+        return os.environ.get(key, default)
+
+    def refresh(self):
+        """Drop the cached bundle and fetch it again"""
+        with self._lock:
+            self._load()
+        return self._secrets
+
+    def is_stale(self):
+        if self._secrets is None or self._fetched_at is None:
+            return True
+        return (time.monotonic() - self._fetched_at) >= self.ttl_seconds
+
+    def _get_bundle(self):
+        if self.is_stale():
+            with self._lock:
+                # Another thread may have loaded it while we waited
+                if self.is_stale():
+                    self._load()
+        return self._secrets
+
+    @timed('secrets')
+    def _load(self):
+        start = time.perf_counter()
+        secrets, source = self._fetch_doppler()
+        doppler_failed = secrets is None and bool(os.environ.get('DOPPLER_TOKEN'))
+        if doppler_failed and self._secrets is not None:
+            # A failed refresh must not swap real secrets for file/env defaults (e.g. a placeholder DATABASE_URL)
+            self._retry_soon()
+            logger.warning(f"Doppler refresh failed; serving the {self.source} bundle, retrying in "
+                           f"{min(RETRY_SECONDS, self.ttl_seconds):.0f}s")
+            return
+        if secrets is None:
+            secrets, source = self._fetch_file()
+        if secrets is None and doppler_failed:
+            # Nothing real to serve: fail this request rather than build the process-wide engine
+            # from env defaults; the next read fetches again
+            raise SecretsUnavailableError('Doppler secrets download failed and no secrets are loaded yet')
+        if secrets is None:
+            secrets, source = {}, 'env'
+
+        self._secrets = secrets
+        self._fetched_at = time.monotonic()
+        self.source = source
+        self.last_fetch_ms = (time.perf_counter() - start) * 1000
+        self.fetch_count += 1
+        if doppler_failed:
+            self._retry_soon()
+        logger.info(f"Loaded {len(secrets)} secrets from {source} in {self.last_fetch_ms:.1f}ms")
+
+    def _retry_soon(self):
+        """Keep the current bundle but treat it as stale after RETRY_SECONDS instead of the full TTL"""
+        self._fetched_at = time.monotonic() - self.ttl_seconds + min(RETRY_SECONDS, self.ttl_seconds)
+
+    def _fetch_doppler(self):
+        token = os.environ.get('DOPPLER_TOKEN')
+        if not token:
+            return None, None
+        try:
+            # Imported on first fetch so requests (~100ms) stays off the module import path
+            import requests
+            response = requests.get(
+                DOPPLER_SECRETS_URL,
+                headers={'Authorization': f'Bearer {token}'},
+                params={'format': 'json'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json(), 'doppler'
+        except Exception as e:
+            logger.error(f"Error downloading Doppler secrets: {e}")
+            return None, None
+
+    def _fetch_file(self):
+        path = os.environ.get('SECRETS_FILE')
+        if not path:
+            return None, None
+        try:
+            with open(path) as f:
+                return json.load(f), 'file'
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading secrets file {path}: {e}")
+            return None, None
+
+
+# Global instance
+secrets_provider = None
+
+def get_secrets_provider():
+    """Lazy initialization of the per-container secrets provider"""
+    global secrets_provider
+    if secrets_provider is None:
+        secrets_provider = SecretsProvider()
+    return secrets_provider
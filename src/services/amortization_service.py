@@ -1,143 +1,205 @@
+import hashlib
+import json
 import logging
+from datetime import date
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker
 from models.user_amortization_data import UserAmortizationData
 from models.user_score import UserScore
-from utils.table_generator import TableGenerator
-from database import get_db_session, close_db_session
+from utils.table_generator import TableGenerator, to_row_format
+from database import session_scope, upsert
+from instrumentation import stage, timed
+from cache import user_risk_cache
 
 logger = logging.getLogger(__name__)
 
-def get_user_risk(user_id):
-    session = get_db_session()
+def get_user_risk(user_id, session=None):
+    """Risk level for user_id (None if unknown), served from user_risk_cache when fresh"""
+    return user_risk_cache.get(str(user_id), lambda: load_user_risk(user_id, session))
+
+def load_user_risk(user_id, session=None):
     try:
-        user_score = session.query(UserScore).filter_by(userId=user_id).first()
-        if user_score:
-            return float(user_score.risk_level) if user_score.risk_level else 0.0
-        return None
+        with session_scope(session) as session:
+            risk_level = session.query(UserScore.risk_level).filter_by(userId=user_id).first()
+            if risk_level:
+                return float(risk_level[0]) if risk_level[0] else 0.0
+            return None
     except SQLAlchemyError as e:
         logger.error(f"Error getting user risk: {str(e)}")
         return None
-    finally:
-        close_db_session(session)
 
-def save_amortization(user_id, user_risk, period_value, instalment_value, amount):
-    session = get_db_session()
-    try:
-        data = UserAmortizationData(
-            userId=user_id,
-            userRisk=user_risk,
-            instalment=instalment_value,
-            period=period_value,
-            amount=amount
-        )
-        session.add(data)
-        session.commit()
-        session.refresh(data)
-        return data.to_dict()
-    except SQLAlchemyError as e:
-        session.rollback()
-        logger.error(f"Error saving amortization data: {str(e)}")
-        raise e
-    finally:
-        close_db_session(session)
+def plan_input_hash(user_id, user_risk, period_value, instalment_value, amount, origin_date):
+    """Hash of the plan inputs, formatted at the column scales so it survives a DB round trip"""
+    def fmt(value, scale):
+        return '' if value in (None, 'null') else f"{float(value):.{scale}f}"
+    key = '|'.join([str(user_id), fmt(user_risk, 6), fmt(period_value, 6), fmt(instalment_value, 2),
+                    fmt(amount, 2), origin_date.isoformat()])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
 
-def handle_amortization(user_id, user_risk, data):
-    session = get_db_session()
-    try:
-        user_data = session.query(UserAmortizationData).filter_by(userId=user_id).first()
-        period_value = 0 if data.get('period') == 'null' else data.get('period')
-        instalment_value = 0 if data.get('instalment') == 'null' else data.get('instalment')
-        amount = data['amount']
-        
-        logger.info(f"Values: period={period_value}, instalment={instalment_value}, amount={amount}")
+def serialize_plan(plan):
+    return json.dumps(plan, separators=(',', ':'))
+
+def handle_amortization(user_id, user_risk, data, session=None, plan=None, origin_date=None):
+    with session_scope(session) as session:
+        try:
+            period_value = 0 if data.get('period') == 'null' else data.get('period')
+            instalment_value = 0 if data.get('instalment') == 'null' else data.get('instalment')
+            amount = data['amount']
+            origin_date = origin_date or date.today()
+            if plan is None:
+                plan = generate_plan(data, user_risk, columnar=True, start_date=origin_date)
         
-        if user_data is None:
-            logger.info("Creating new amortization record")
-            # Create new record using the same session
-            new_data = UserAmortizationData(
-                userId=user_id,
-                userRisk=user_risk,
-                instalment=instalment_value,
-                period=period_value,
-                amount=amount
-            )
-            session.add(new_data)
-        else:
-            logger.info("Updating existing amortization record")
-            user_data.userRisk = user_risk
-            user_data.period = period_value
-            user_data.instalment = instalment_value
-            user_data.amount = amount
+            logger.info(f"Values: period={period_value}, instalment={instalment_value}, amount={amount}")
         
-        session.commit()
-        logger.info("Amortization data saved successfully")
-    except SQLAlchemyError as e:
-        session.rollback()
-        logger.error(f"SQLAlchemy error in handle_amortization: {str(e)}", exc_info=True)
-        raise e
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Unexpected error in handle_amortization: {str(e)}", exc_info=True)
-        raise e
-    finally:
-        close_db_session(session)
+            # Insert or update in a single statement; safe under concurrent invocations
+            with stage('persist'):
+                upsert(session, UserAmortizationData, [{
+                    'userId': user_id,
+                    'userRisk': user_risk,
+                    'instalment': instalment_value,
+                    'period': period_value,
+                    'amount': amount,
+                    'schedule': serialize_plan(plan),
+                    'originDate': origin_date,
+                    'inputHash': plan_input_hash(user_id, user_risk, period_value, instalment_value, amount, origin_date)
+                }], returning=False)
+            logger.info("Amortization data saved successfully")
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"SQLAlchemy error in handle_amortization: {str(e)}", exc_info=True)
+            raise e
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Unexpected error in handle_amortization: {str(e)}", exc_info=True)
+            raise e
+
+@timed('risk_lookup')
+def resolve_user_risk(data, session=None):
+    """Use provided user_risk or get it from the database if userId provided; returns (risk, error)"""
+    user_id = data.get('userId')
+    if 'user_risk' in data:
+        return float(data['user_risk']), None
+    if user_id:
+        user_risk = get_user_risk(user_id, session)
+        if user_risk is None:
+            return None, {'error': 'User not found or no risk level available'}
+        return user_risk, None
+    return None, {'error': 'Either userId or user_risk must be provided'}
 
-def repayment_plan(data):
+@timed('plan')
+def generate_plan(data, user_risk, columnar=False, start_date=None):
+    payment_type = data.get('payment_type')
+    repayment_type = 'repayment_plan_period' if payment_type == 'period' else 'repayment_plan_instalment'
+    
+    # Prepare data for table generation (remove non-calculation fields)
+    calc_data = data.copy()
+    calc_data.pop('payment_type', None)
+    calc_data.pop('userId', None)
+    calc_data['user_risk'] = user_risk
+    
+    generator = TableGenerator(repayment_type, columnar, start_date)
+    return generator.use_method(**calc_data)
+
+def repayment_plan(data, session=None, columnar=False):
     try:
-        payment_type = data.get('payment_type')
         user_id = data.get('userId')
-        repayment_type = 'repayment_plan_period' if payment_type == 'period' else 'repayment_plan_instalment'
-        
-        # Use provided user_risk or get from database if userId provided
-        if 'user_risk' in data:
-            user_risk = float(data['user_risk'])
-        elif user_id:
-            user_risk = get_user_risk(user_id)
-            if user_risk is None:
-                return {'error': 'User not found or no risk level available'}
-        else:
-            return {'error': 'Either userId or user_risk must be provided'}
-        
-        # Prepare data for table generation (remove non-calculation fields)
-        calc_data = data.copy()
-        calc_data.pop('payment_type', None)
-        calc_data.pop('userId', None)
-        calc_data['user_risk'] = user_risk
+        user_risk, error = resolve_user_risk(data, session)
+        if error:
+            return error
         
-        generator = TableGenerator(repayment_type)
-        res = generator.use_method(**calc_data)
+        # Generate columnar once: it is both the stored schedule and (optionally) the response
+        origin_date = date.today()
+        res = generate_plan(data, user_risk, columnar=True, start_date=origin_date)
         
         # Only save to database if userId is provided and calculation succeeded
         if user_id and res and 'error' not in res:
             try:
-                handle_amortization(str(user_id), user_risk, data)
+                handle_amortization(str(user_id), user_risk, data, session, plan=res, origin_date=origin_date)
             except Exception as db_error:
                 logger.error(f"Database save failed: {str(db_error)}")
                 # Don't fail the request if DB save fails
         
-        return res
+        return res if columnar else to_row_format(res)
     except Exception as e:
         logger.error(f"Error in repayment_plan: {str(e)}", exc_info=True)
         return {'error': str(e)}
 
-def get_user_amortization(user_id):
-    session = get_db_session()
+def repayment_plan_batch(data, session=None, columnar=False):
+    """Quote many scenarios with one risk lookup; persist only data['selected'] (index) if given"""
     try:
-        user_data = session.query(UserAmortizationData).filter_by(userId=user_id).first()
-        if user_data is None:
-            return {'error': 'User not found'}, 404
+        scenarios = data.get('scenarios')
+        if not isinstance(scenarios, list) or not scenarios:
+            return {'error': 'scenarios must be a non-empty list'}
+        
+        user_id = data.get('userId')
+        user_risk, error = resolve_user_risk(data, session)
+        if error:
+            return error
+        
+        origin_date = date.today()
+        results = []
+        for scenario in scenarios:
+            try:
+                results.append(generate_plan(scenario, user_risk, columnar=True, start_date=origin_date))
+            except Exception as e:
+                logger.error(f"Error in repayment_plan_batch scenario: {str(e)}")
+                results.append({'error': str(e)})
+        
+        selected = data.get('selected')
+        if user_id and selected is not None:
+            if not isinstance(selected, int) or not 0 <= selected < len(scenarios):
+                return {'error': f'selected must be an index into scenarios (0-{len(scenarios) - 1})'}
+            if 'error' not in results[selected]:
+                try:
+                    handle_amortization(str(user_id), user_risk, scenarios[selected], session,
+                                        plan=results[selected], origin_date=origin_date)
+                except Exception as db_error:
+                    logger.error(f"Database save failed: {str(db_error)}")
+                    # Don't fail the request if DB save fails
         
-        result = recalculate_plan(user_data)
-        result['user_data'] = user_data.to_dict()
-        return result, 200
+        if not columnar:
+            results = [to_row_format(result) for result in results]
+        return {'results': results, 'user_risk': user_risk}
+    except Exception as e:
+        logger.error(f"Error in repayment_plan_batch: {str(e)}", exc_info=True)
+        return {'error': str(e)}
+
+def get_plan_input_hash(user_id, session=None):
+    """Stored plan's inputHash (None if absent or not yet backfilled) without loading the schedule"""
+    with session_scope(session) as session:
+        return session.query(UserAmortizationData.inputHash).filter_by(userId=user_id).scalar()
+
+def get_user_amortization(user_id, session=None, columnar=False):
+    """(plan, status code, inputHash of the stored inputs it was generated from)"""
+    try:
+        with session_scope(session) as session:
+            user_data = session.query(UserAmortizationData).filter_by(userId=user_id).first()
+            if user_data is None:
+                return {'error': 'User not found'}, 404, None
+            
+            if user_data.schedule:
+                result = json.loads(user_data.schedule)
+            else:
+                result = backfill_plan(user_data)
+            
+            if not columnar:
+                result = to_row_format(result)
+            result['user_data'] = user_data.to_dict()
+            return result, 200, user_data.inputHash
     except Exception as e:
         logger.error(f"Error getting user amortization: {str(e)}")
-        return {'error': str(e)}, 500
-    finally:
-        close_db_session(session)
+        return {'error': str(e)}, 500, None
+
+def backfill_plan(user_data):
+    """Rows saved before plans were persisted: compute once from today and store the result"""
+    user_data.originDate = user_data.originDate or date.today()
+    result = recalculate_plan(user_data, columnar=True)
+    if 'error' not in result:
+        user_data.schedule = serialize_plan(result)
+        user_data.inputHash = plan_input_hash(user_data.userId, user_data.userRisk, user_data.period,
+                                              user_data.instalment, user_data.amount, user_data.originDate)
+    return result
 
-def recalculate_plan(user_data):
+def recalculate_plan(user_data, columnar=False):
     try:
         user_risk = float(user_data.userRisk) if user_data.userRisk else 0.0
         period_value = float(user_data.period) if user_data.period else 0.0
@@ -151,7 +213,7 @@ def recalculate_plan(user_data):
             'instalment': instalment_value,
             'amount': amount
         }
-        generator = TableGenerator(repayment_type)
+        generator = TableGenerator(repayment_type, columnar, user_data.originDate)
         res = generator.use_method(**data)
         return res
     except Exception as e:
@@ -0,0 +1,51 @@
+import logging
+import time
+from sqlalchemy import select, update
+from models.user_score import UserScore
+from utils.kmeans_engine import feature_matrix
+from utils.risk_distance_calculator import get_risk_calculator
+from database import session_scope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+def rescore_users(session=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Re-score every user_score row against the current risk model.
+
+    Rows are keyset-paged on nrow; each chunk is scored as one matrix against the centroids,
+    written back with a single bulk UPDATE by primary key and committed on its own, so row
+    locks are held for one chunk (concurrent survey upserts do not wait for the whole run)
+    and a failure keeps the chunks already written. A caller's session runs it in one transaction.
+    """
+    start = time.perf_counter()
+    rows = 0
+    with session_scope(session) as scope:
+        risk_calc = get_risk_calculator(scope)
+        if risk_calc.non_defaulter_centroids is None:
+            return {'error': 'Risk distance calculator not initialized'}
+
+    after = None
+    while True:
+        with session_scope(session) as scope:
+            query = select(UserScore).order_by(UserScore.nrow).limit(chunk_size)
+            if after is not None:
+                query = query.where(UserScore.nrow > after)
+            chunk = scope.scalars(query).all()
+            if not chunk:
+                break
+            # to_dict keeps the feature mapping identical to the single-user /clustered-score path
+            X = feature_matrix([user.to_dict() for user in chunk], risk_calc.feature_cols)
+            distances, risk_scores, closest = risk_calc.calculate_risk_distances(X)
+            scope.execute(update(UserScore), [
+                {'nrow': user.nrow, 'risk_distance': float(distance), 'risk_score': float(score), 'closest_cluster': int(cluster)}
+                for user, distance, score, cluster in zip(chunk, distances, risk_scores, closest)
+            ])
+            after = chunk[-1].nrow
+        rows += len(chunk)
+        logger.info(f"Re-scored {rows} users")
+
+    seconds = time.perf_counter() - start
+    rows_per_second = rows / seconds if seconds > 0 else 0.0
+    logger.info(f"Re-scored {rows} users in {seconds:.2f}s ({rows_per_second:.0f} rows/s)")
+    return {'rows': rows, 'seconds': round(seconds, 3), 'rows_per_second': round(rows_per_second, 1)}
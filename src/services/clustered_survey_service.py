@@ -4,17 +4,17 @@ from utils.risk_distance_calculator import get_risk_calculator
 
 logger = logging.getLogger(__name__)
 
-def register_clustered_survey(data):
+def register_clustered_survey(data, session=None):
     """Register survey and calculate risk distance classification"""
     try:
         # First, register the survey normally
-        survey_result = register_survey_method(data)
+        survey_result = register_survey_method(data, session)
         
         if 'error' in survey_result:
             return survey_result
         
         # Calculate risk distance using the survey scores
-        risk_calc = get_risk_calculator()
+        risk_calc = get_risk_calculator(session)
         risk_result = risk_calc.calculate_risk_distance(survey_result)
         
         # Combine results
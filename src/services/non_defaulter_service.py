@@ -1,60 +1,161 @@
+import json
 import logging
+from sqlalchemy import func, select
 from sqlalchemy.exc import SQLAlchemyError
 from models.non_defaulter import NonDefaulter
-from database import get_db_session, close_db_session
+from database import on_commit, session_scope
 
 logger = logging.getLogger(__name__)
 
-def create_non_defaulter(data):
-    session = get_db_session()
-    try:
-        new_non_defaulter = NonDefaulter(
-            userId=data['userId'],
-            demographics=data.get('demographics', 0),
-            financialResponsibility=data.get('financialResponsibility', 0),
-            riskAversion=data.get('riskAversion', 0),
-            impulsivity=data.get('impulsivity', 0),
-            futureOrientation=data.get('futureOrientation', 0),
-            financialKnowledge=data.get('financialKnowledge', 0),
-            locusOfControl=data.get('locusOfControl', 0),
-            socialInfluence=data.get('socialInfluence', 0),
-            resilience=data.get('resilience', 0),
-            familismo=data.get('familismo', 0),
-            respect=data.get('respect', 0),
-            risk_level=data.get('risk_level', 0)
-        )
-        session.add(new_non_defaulter)
-        session.commit()
-        session.refresh(new_non_defaulter)
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# NDJSON pages are bounded by the 6 MB Lambda response, not by client memory
+MAX_EXPORT_ROWS = 10000
+STREAM_CHUNK_SIZE = 1000
+
+# API field name -> column, in to_dict order (risk_level is exposed as riskLevel)
+FIELD_COLUMNS = {
+    ('riskLevel' if column.key == 'risk_level' else column.key): column
+    for column in NonDefaulter.__table__.columns if column.key not in ('nrow', 'rowVersion')
+}
+
+def create_non_defaulter(data, session=None):
+    with session_scope(session) as session:
+        try:
+            new_non_defaulter = NonDefaulter(
+                userId=data['userId'],
+                demographics=data.get('demographics', 0),
+                financialResponsibility=data.get('financialResponsibility', 0),
+                riskAversion=data.get('riskAversion', 0),
+                impulsivity=data.get('impulsivity', 0),
+                futureOrientation=data.get('futureOrientation', 0),
+                financialKnowledge=data.get('financialKnowledge', 0),
+                locusOfControl=data.get('locusOfControl', 0),
+                socialInfluence=data.get('socialInfluence', 0),
+                resilience=data.get('resilience', 0),
+                familismo=data.get('familismo', 0),
+                respect=data.get('respect', 0),
+                risk_level=data.get('risk_level', 0)
+            )
+            session.add(new_non_defaulter)
+            session.flush()
+            session.refresh(new_non_defaulter)
         
-        # Refresh risk calculator with new data
-        refresh_risk_calculator()
+            # Fold the new row into the risk calculator (O(1) in the table size) once it is committed;
+            # a rolled-back insert must not leave a point in the shared model until the next refit
+            committed = {**new_non_defaulter.to_dict(), 'nrow': new_non_defaulter.nrow}
+            on_commit(session, lambda: update_risk_calculator(committed))
         
-        return new_non_defaulter.to_dict()
-    except SQLAlchemyError as e:
-        session.rollback()
-        logger.error(f"Database error in create_non_defaulter: {str(e)}")
-        return {'error': f'Database error: {str(e)}'}
-    finally:
-        close_db_session(session)
+            return new_non_defaulter.to_dict()
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Database error in create_non_defaulter: {str(e)}")
+            return {'error': f'Database error: {str(e)}'}
 
-def get_all_non_defaulters():
-    session = get_db_session()
+def get_all_non_defaulters(session=None, include_nrow=False):
     try:
-        non_defaulters = session.query(NonDefaulter).all()
-        return [nd.to_dict() for nd in non_defaulters]
+        with session_scope(session) as session:
+            non_defaulters = session.query(NonDefaulter).all()
+            if include_nrow:
+                return [{**nd.to_dict(), 'nrow': nd.nrow} for nd in non_defaulters]
+            return [nd.to_dict() for nd in non_defaulters]
     except SQLAlchemyError as e:
         logger.error(f"Database error in get_all_non_defaulters: {str(e)}")
         return {'error': f'Database error: {str(e)}'}
-    finally:
-        close_db_session(session)
 
-def refresh_risk_calculator():
-    """Refresh the risk calculator after adding new non-defaulters"""
+def parse_page_params(query_parameters, max_limit=MAX_PAGE_SIZE):
+    """(after, limit, fields) from ?after=&limit=&fields=a,b; raises ValueError on bad input"""
+    try:
+        after = int(query_parameters.get('after') or 0)
+        limit = int(query_parameters.get('limit') or min(DEFAULT_PAGE_SIZE, max_limit))
+    except ValueError:
+        raise ValueError('after and limit must be integers')
+    if after < 0 or not 0 < limit <= max_limit:
+        raise ValueError(f'limit must be between 1 and {max_limit} and after must be >= 0')
+    fields = query_parameters.get('fields')
+    fields = [f.strip() for f in fields.split(',') if f.strip()] if fields else list(FIELD_COLUMNS)
+    unknown = [f for f in fields if f not in FIELD_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return after, limit, fields
+
+def page_query(after, limit, fields):
+    """Keyset page: only the projected columns, rows after the nrow cursor, in nrow order"""
+    return (select(NonDefaulter.nrow, *(FIELD_COLUMNS[f] for f in fields))
+            .where(NonDefaulter.nrow > after)
+            .order_by(NonDefaulter.nrow)
+            .limit(limit))
+
+def page_fingerprint(session=None, after=0, limit=DEFAULT_PAGE_SIZE):
+    """(row count, max nrow, sum of row versions) of the keyset page: one aggregate over the page's index range.
+
+    Changes whenever a row in the page is inserted, deleted or updated, without reading the page itself.
+    """
+    page = (select(NonDefaulter.nrow, NonDefaulter.rowVersion)
+            .where(NonDefaulter.nrow > after)
+            .order_by(NonDefaulter.nrow)
+            .limit(limit)
+            .subquery())
+    with session_scope(session) as session:
+        return tuple(session.execute(
+            select(func.count(), func.max(page.c.nrow), func.sum(func.coalesce(page.c.rowVersion, 1)))
+        ).one())
+
+def row_to_dict(row, fields):
+    # Same formatting as NonDefaulter.to_dict: numbers as floats, zero/NULL as None
+    return {f: (v if f == 'userId' else float(v) if v else None) for f, v in zip(fields, row[1:])}
+
+def list_non_defaulters(session=None, after=0, limit=DEFAULT_PAGE_SIZE, fields=None):
+    """One keyset page; returns (items, next_cursor) where next_cursor is None on the last page"""
+    fields = fields or list(FIELD_COLUMNS)
+    try:
+        with session_scope(session) as session:
+            rows = session.execute(page_query(after, limit, fields)).all()
+            next_cursor = rows[-1].nrow if len(rows) == limit else None
+            return [row_to_dict(row, fields) for row in rows], next_cursor
+    except SQLAlchemyError as e:
+        logger.error(f"Database error in list_non_defaulters: {str(e)}")
+        return {'error': f'Database error: {str(e)}'}, None
+
+def export_non_defaulters(out, session=None, after=0, limit=None, fields=None):
+    """Write non-defaulters to out as NDJSON straight off a server-side cursor.
+
+    Rows are encoded one at a time, so memory stays flat regardless of the table size.
+    Returns (rows written, nrow of the last row written or None).
+    """
+    fields = fields or list(FIELD_COLUMNS)
+    stmt = page_query(after, limit, fields).execution_options(yield_per=STREAM_CHUNK_SIZE)
+    written, last = 0, None
+    with session_scope(session) as session:
+        for row in session.execute(stmt):
+            out.write(json.dumps(row_to_dict(row, fields), separators=(',', ':')))
+            out.write('\n')
+            written, last = written + 1, row.nrow
+    return written, last
+
+def get_non_defaulter_fingerprint(session=None):
+    """(row count, max nrow, sum of row versions) of non_defaulters: one aggregate query identifying the training data.
+
+    The version sum changes on any in-place UPDATE, which count and max nrow cannot see.
+    """
+    with session_scope(session) as session:
+        count, max_nrow, version_sum = session.query(func.count(NonDefaulter.nrow), func.max(NonDefaulter.nrow),
+                                                     func.sum(func.coalesce(NonDefaulter.rowVersion, 1))).one()
+        return int(count), int(max_nrow or 0), int(version_sum or 0)
+
+def get_non_defaulters_since(nrow, session=None):
+    """Non-defaulters inserted after the given nrow, oldest first"""
+    with session_scope(session) as session:
+        non_defaulters = session.query(NonDefaulter).filter(NonDefaulter.nrow > nrow).order_by(NonDefaulter.nrow).all()
+        return [nd.to_dict() for nd in non_defaulters]
+
+def update_risk_calculator(non_defaulter, session=None):
+    """Stream a new non-defaulter into an already-loaded risk calculator"""
     try:
-        from utils.risk_distance_calculator import get_risk_calculator
-        risk_calc = get_risk_calculator()
-        risk_calc._initialize_model()
-        logger.info("Risk calculator refreshed")
+        from utils import risk_distance_calculator
+        # Nothing to update yet; the first get_risk_calculator() will load the committed table
+        if risk_distance_calculator.risk_calculator is None:
+            return
+        risk_distance_calculator.risk_calculator.add_non_defaulter(non_defaulter, session)
     except Exception as e:
-        logger.error(f"Error refreshing risk calculator: {str(e)}")
\ No newline at end of file
+        logger.error(f"Error updating risk calculator: {str(e)}")
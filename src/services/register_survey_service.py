@@ -1,11 +1,32 @@
 import logging
+from itertools import groupby
 from sqlalchemy.exc import SQLAlchemyError
 from models.user_score import UserScore
 from utils.question_scoring import QuestionScoring
-from database import get_db_session, close_db_session
+from database import on_commit, session_scope, upsert
+from structured_logging import add_request_fields, debug_enabled
+from instrumentation import timed
+from cache import user_risk_cache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_CHUNK_SIZE = 500
+
+# Map dynamic section names to database fields
+FIELD_MAPPING = {
+    'demographics': 'demographics',
+    'financialResponsibility': 'financialResponsibility',
+    'riskAversion': 'riskAversion', 
+    'impulsivity': 'impulsivity',
+    'futureOrientation': 'futureOrientation',
+    'financialKnowledge': 'financialKnowledge',
+    'locusOfControl': 'locusOfControl',
+    'socialInfluence': 'socialInfluence',
+    'resilience': 'resilience',
+    'familismo': 'familismo',
+    'respect': 'respect'
+}
+
 def calc_score(section, values, gender=None):
     res = {}
     
@@ -26,116 +47,143 @@ def calc_score(section, values, gender=None):
     if section != 'demographics' and gender == 'F':
         gender_boost = 1.15  # 15% boost for females in all sections
         scoring_res *= gender_boost
-        print(f"Applied female gender boost of {gender_boost} to section {section}")
     
     res[section] = scoring_res * weight
-    print(f"Section: {section}, Scoring Result: {scoring_res}, Weight: {weight}, Final Score: {res[section]}")
+    if debug_enabled(logger):
+        logger.debug('section scored', extra={'section': section, 'score': scoring_res, 'weight': weight,
+                                              'finalScore': res[section], 'genderBoost': section != 'demographics' and gender == 'F'})
     return res
 
-def register_survey_method(data):
-    session = get_db_session()
-    try:
-        print(f"Input data keys: {list(data.keys())}")
-        
-        # Handle different input structures
-        if 'demographics' in data:
-            demographics_data = data['demographics']
-        elif 'sections' in data and 'demographics' in data['sections']:
-            demographics_data = data['sections']['demographics']
-        else:
-            raise ValueError("No demographics section found in input data")
-        
-        id_number = demographics_data.get('idNumber')
-        gender = demographics_data.get('gender')
-        
-        if not id_number:
-            raise ValueError("idNumber is required in demographics")
-        
-        # Prepare data for scoring - include demographics and all sections
-        all_sections = {'demographics': demographics_data}
-        if 'sections' in data:
-            all_sections.update(data['sections'])
-        
-        # Calculate scores with gender consideration, filtering out empty results
-        score_results = [calc_score(section, values, gender) for section, values in all_sections.items()]
-        scores = {k: v for result in score_results for k, v in result.items() if result}
-        
-        # Apply variance enhancement to prevent clustering
-        if scores:
-            score_values = list(scores.values())
-            mean_score = sum(score_values) / len(score_values)
-            enhanced_scores = {}
-            for section, score in scores.items():
-                # Amplify deviations from mean to increase differentiation
-                deviation = score - mean_score
-                enhanced_score = score + (deviation * 0.15)  # 15% amplification
-                enhanced_scores[section] = max(0.1, enhanced_score)  # Ensure positive scores
-            
-            raw_sum = sum(enhanced_scores.values())
-            
-            # Normalize to 0-100 scale based on theoretical min/max
-            # Min: all 1s, male, unemployed ≈ 8.5
-            # Max: all 5s, female, employed ≈ 95 (with 1.5x boost)
-            min_possible = 8.5
-            max_possible = 95.0
-            
-            # Normalize to 0-100
-            sum_scr = max(0, min(100, ((raw_sum - min_possible) / (max_possible - min_possible)) * 100))
-            scores = enhanced_scores  # Use enhanced scores
-        else:
-            sum_scr = 0
-
-        # Check if user already exists
-        existing_user = session.query(UserScore).filter_by(userId=id_number).first()
-
-        print(f"Registering survey for user {id_number} (gender: {gender}) with enhanced scores: {list(scores.values())}. Raw total: {raw_sum if scores else 0}, Normalized (0-100): {sum_scr}")
-
-        # Map dynamic section names to database fields
-        field_mapping = {
-            'demographics': 'demographics',
-            'financialResponsibility': 'financialResponsibility',
-            'riskAversion': 'riskAversion', 
-            'impulsivity': 'impulsivity',
-            'futureOrientation': 'futureOrientation',
-            'financialKnowledge': 'financialKnowledge',
-            'locusOfControl': 'locusOfControl',
-            'socialInfluence': 'socialInfluence',
-            'resilience': 'resilience',
-            'familismo': 'familismo',
-            'respect': 'respect'
-        }
-
-        if existing_user:
-            # Update existing user dynamically
-            for section, score in scores.items():
-                field_name = field_mapping.get(section)
-                if field_name and hasattr(existing_user, field_name):
-                    setattr(existing_user, field_name, score)
-            existing_user.risk_level = sum_scr
-            session.commit()
-            session.refresh(existing_user)
-            return existing_user.to_dict()
-        else:
-            # Create new user dynamically
-            user_data = {'userId': id_number, 'risk_level': sum_scr}
-            for section, score in scores.items():
-                field_name = field_mapping.get(section)
-                if field_name:
-                    user_data[field_name] = score
-            
-            new_score = UserScore(**user_data)
-            session.add(new_score)
-            session.commit()
-            session.refresh(new_score)
-            return new_score.to_dict()
-            
-    except SQLAlchemyError as e:
-        session.rollback()
-        logger.error(f"Database error in register_survey_method: {str(e)}")
-        return {'error': f'Database error: {str(e)}'}
-    except Exception as e:
-        session.rollback()
-        logger.error(f"Error in register_survey_method: {str(e)}")
-        return {'error': str(e)}
-    finally:
-        close_db_session(session)
\ No newline at end of file
+@timed('scoring')
+def score_survey(data):
+    """Score one survey into a user_score row dict; raises ValueError on invalid input"""
+    # Handle different input structures
+    if 'demographics' in data:
+        demographics_data = data['demographics']
+    elif 'sections' in data and 'demographics' in data['sections']:
+        demographics_data = data['sections']['demographics']
+    else:
+        raise ValueError("No demographics section found in input data")
+
+    id_number = demographics_data.get('idNumber')
+    gender = demographics_data.get('gender')
+
+    if not id_number:
+        raise ValueError("idNumber is required in demographics")
+
+    # Prepare data for scoring - include demographics and all sections
+    all_sections = {'demographics': demographics_data}
+    if 'sections' in data:
+        all_sections.update(data['sections'])
+
+    # Calculate scores with gender consideration, filtering out empty results
+    score_results = [calc_score(section, values, gender) for section, values in all_sections.items()]
+    scores = {k: v for result in score_results for k, v in result.items() if result}
+
+    # Apply variance enhancement to prevent clustering
+    if scores:
+        score_values = list(scores.values())
+        mean_score = sum(score_values) / len(score_values)
+        enhanced_scores = {}
+        for section, score in scores.items():
+            # Amplify deviations from mean to increase differentiation
+            deviation = score - mean_score
+            enhanced_score = score + (deviation * 0.15)  # 15% amplification
+            enhanced_scores[section] = max(0.1, enhanced_score)  # Ensure positive scores
+    
+        raw_sum = sum(enhanced_scores.values())
+    
+        # Normalize to 0-100 scale based on theoretical min/max
+        # Min: all 1s, male, unemployed ≈ 8.5
+        # Max: all 5s, female, employed ≈ 95 (with 1.5x boost)
+        min_possible = 8.5
+        max_possible = 95.0
+    
+        # Normalize to 0-100
+        sum_scr = max(0, min(100, ((raw_sum - min_possible) / (max_possible - min_possible)) * 100))
+        scores = enhanced_scores  # Use enhanced scores
+    else:
+        sum_scr = 0
+
+    if debug_enabled(logger):
+        logger.debug('survey scored', extra={'userId': id_number, 'gender': gender, 'scores': scores,
+                                             'rawTotal': raw_sum if scores else 0, 'riskLevel': sum_scr})
+
+    user_data = {'userId': id_number, 'risk_level': sum_scr}
+    for section, score in scores.items():
+        field_name = FIELD_MAPPING.get(section)
+        if field_name:
+            user_data[field_name] = score
+    return user_data
+
+def register_survey_method(data, session=None):
+    with session_scope(session) as session:
+        try:
+            user_data = score_survey(data)
+
+            # Insert or update in a single statement; safe under concurrent invocations
+            user_score = upsert(session, UserScore, [user_data])[0]
+            on_commit(session, lambda: user_risk_cache.invalidate(str(user_data['userId'])))
+            return user_score.to_dict()
+
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Database error in register_survey_method: {str(e)}")
+            return {'error': f'Database error: {str(e)}'}
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error in register_survey_method: {str(e)}")
+            return {'error': str(e)}
+
+def register_survey_batch(data, session=None, chunk_size=DEFAULT_BATCH_CHUNK_SIZE):
+    """Score a list of surveys in one pass and write each chunk with one multi-row upsert.
+
+    Accepts {'surveys': [...]} or a bare list. Returns one entry per survey, in input order:
+    the stored user_score row, or {'error': ...} for surveys that failed to score or write.
+    """
+    surveys = data.get('surveys') if isinstance(data, dict) else data
+    if not isinstance(surveys, list) or not surveys:
+        return {'error': 'surveys must be a non-empty list'}
+
+    results = [None] * len(surveys)
+    # A userId repeated within the batch is merged in order, as sequential upserts would: later
+    # surveys overwrite the sections (and risk_level) they scored, earlier-only sections are kept
+    rows = {}
+    indices = {}
+    for index, survey in enumerate(surveys):
+        try:
+            user_data = score_survey(survey)
+        except Exception as e:
+            results[index] = {'error': str(e)}
+            continue
+        # Key by the stored form: 12345 and '12345' are one user_score row, and RETURNING gives back strings
+        user_data['userId'] = str(user_data['userId'])
+        rows.setdefault(user_data['userId'], {}).update(user_data)
+        indices.setdefault(user_data['userId'], []).append(index)
+
+    pending = list(rows.values())
+    with session_scope(session) as session:
+        for offset in range(0, len(pending), chunk_size):
+            chunk = pending[offset:offset + chunk_size]
+            try:
+                # Savepoint per chunk: a failed chunk is reported and the rest of the batch still commits
+                with session.begin_nested():
+                    stored = {}
+                    # Rows only update the sections they were scored on, so one statement per column set
+                    column_set = lambda row: sorted(row)
+                    for _, group in groupby(sorted(chunk, key=column_set), key=column_set):
+                        for user_score in upsert(session, UserScore, list(group)):
+                            stored[user_score.userId] = user_score.to_dict()
+                # After the request commits: invalidating earlier would let a concurrent reader re-cache the old risk
+                on_commit(session, lambda chunk=chunk: user_risk_cache.invalidate(*(str(row['userId']) for row in chunk)))
+            except SQLAlchemyError as e:
+                logger.error(f"Database error in register_survey_batch: {str(e)}")
+                stored = {row['userId']: {'error': f'Database error: {str(e)}'} for row in chunk}
+            for row in chunk:
+                for index in indices[row['userId']]:
+                    results[index] = stored[row['userId']]
+
+    failed = sum(1 for result in results if 'error' in result)
+    logger.info(f"Registered {len(surveys) - failed} of {len(surveys)} surveys")
+    add_request_fields(surveys=len(surveys), failed=failed)
+    return {'results': results, 'written': len(surveys) - failed, 'failed': failed}
@@ -0,0 +1,129 @@
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import contextmanager
+
+# Attributes every LogRecord has; anything else on a record came from extra= and is emitted as a field
+STANDARD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# Per-request state: id, whether DEBUG detail is sampled in, start time and summary fields
+_request = contextvars.ContextVar('request', default=None)
+_configured = False
+_sample_rate = 0.0
+
+class RequestState:
+    __slots__ = ('request_id', 'sampled', 'started', 'fields')
+
+    def __init__(self, request_id, sampled, fields):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.fields = fields
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request id and extra fields"""
+
+    def format(self, record):
+        entry = {
+            'timestamp': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        state = _request.get()
+        if state is not None and state.request_id:
+            entry['requestId'] = state.request_id
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, separators=(',', ':'))
+
+class SampledDebugFilter(logging.Filter):
+    """Passes records at or above level; below it, only inside sampled requests.
+
+    Dropped records are never formatted.
+    """
+
+    def __init__(self, level):
+        super().__init__()
+        self.level = level
+
+    def filter(self, record):
+        if record.levelno >= self.level:
+            return True
+        state = _request.get()
+        return state is not None and state.sampled
+
+def debug_enabled(logger):
+    """Guard for hot-path debug logging: when False, no record is built and nothing is formatted"""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    if _sample_rate == 0:
+        return True
+    state = _request.get()
+    return state is not None and state.sampled
+
+def parse_levels(spec):
+    """'services=WARNING,utils.question_scoring=DEBUG' -> {'services': 'WARNING', ...}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' in item:
+            name, level = item.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def configure_logging():
+    """Install the JSON (or LOG_FORMAT=text) formatter and levels on the root logger, once.
+
+    LOG_LEVEL sets the root level (default INFO), LOG_LEVELS per-logger overrides, and
+    DEBUG_SAMPLE_RATE the fraction of requests whose DEBUG detail is logged (default 0).
+    The Lambda runtime pre-installs a root handler, so existing handlers are reused.
+    """
+    global _configured, _sample_rate
+    if _configured:
+        return
+    _configured = True
+
+    root = logging.getLogger()
+    level = logging.getLevelName(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    _sample_rate = float(os.environ.get('DEBUG_SAMPLE_RATE', 0))
+    # Sampled requests need DEBUG to get past the logger; the handler filter drops the unsampled ones
+    root.setLevel(logging.DEBUG if _sample_rate > 0 else level)
+    for name, logger_level in parse_levels(os.environ.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    if not root.handlers:
+        root.addHandler(logging.StreamHandler(sys.stdout))
+    formatter = (logging.Formatter('%(levelname)s:%(name)s:%(message)s')
+                 if os.environ.get('LOG_FORMAT', 'json') == 'text' else JsonFormatter())
+    for handler in root.handlers:
+        handler.setFormatter(formatter)
+        if _sample_rate > 0:
+            handler.setLevel(logging.DEBUG)
+            handler.addFilter(SampledDebugFilter(level))
+
+@contextmanager
+def request_scope(request_id, logger, **fields):
+    """Per-request logging context; emits one summary record with duration_ms on exit"""
+    state = RequestState(request_id, _sample_rate > 0 and random.random() < _sample_rate, fields)
+    token = _request.set(state)
+    try:
+        yield state.fields
+    finally:
+        state.fields['duration_ms'] = round((time.perf_counter() - state.started) * 1000, 2)
+        if state.sampled:
+            state.fields['debugSampled'] = True
+        logger.info('request', extra=state.fields)
+        _request.reset(token)
+
+def add_request_fields(**fields):
+    """Attach fields (timings, counts) to the current request's summary record"""
+    state = _request.get()
+    if state is not None:
+        state.fields.update(fields)
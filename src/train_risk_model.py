@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Offline training for the clustered risk model.
+Fits on the whole non_defaulters table and writes the artifact loaded at cold start:
+python src/train_risk_model.py [--output src/risk_model.npz]
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from database import session_scope
+from services.non_defaulter_service import get_all_non_defaulters, get_non_defaulter_fingerprint
+from utils.kmeans_engine import feature_matrix
+from utils.risk_distance_calculator import RiskDistanceCalculator, get_artifact_path
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output', default=get_artifact_path())
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with session_scope() as session:
+        fingerprint = get_non_defaulter_fingerprint(session)
+        non_defaulters = get_all_non_defaulters(session)
+    if isinstance(non_defaulters, dict) or len(non_defaulters) < 2:
+        print("❌ Need at least 2 non-defaulters to train the risk model")
+        sys.exit(1)
+
+    calculator = RiskDistanceCalculator(initialize=False)
+    start = time.perf_counter()
+    k, iterations = calculator.fit(feature_matrix(non_defaulters, calculator.feature_cols))
+    fit_seconds = time.perf_counter() - start
+    calculator.save_artifact(args.output, fingerprint)
+
+    print(f"✅ Trained on {fingerprint[0]} non-defaulters (max nrow {fingerprint[1]}, version sum {fingerprint[2]}): "
+          f"{k} centroids, {iterations} iterations, {fit_seconds:.3f}s")
+    print(f"💾 Wrote {args.output} ({os.path.getsize(args.output)} bytes)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from calendar import monthrange
+from datetime import date
+
+SCHEDULE_FIELDS = ('period', 'due_date', 'installment', 'principal', 'interest', 'service_fee', 'insurance_fee', 'balance')
+
+
+def add_months(start, months):
+  # Same day-of-month clamping as dateutil's relativedelta(months=n)
+  year, month = divmod(start.month - 1 + months, 12)
+  year += start.year
+  month += 1
+  return date(year, month, min(start.day, monthrange(year, month)[1]))
+
+
+def schedule_columns(r, period, amount, start_date=None):
+  """Annuity schedule as one list per field, computed in a single pass.
+
+  The payment and fees are constant for the whole plan, so they are computed once;
+  interest/principal/balance follow the same recurrence (and float rounding) as
+  Strategy.calculate_values always has, so results match to the cent.
+  """
+  period = int(period)
+  start_date = start_date or date.today()
+  monthly_rate = r/12
+  growth = (1 + monthly_rate)**period
+  payment = amount * (monthly_rate * growth) / (growth - 1)
+  service_fee = amount * 0.015  # Assuming 1.5% service fee
+  insurance_fee = amount * (r/100) # Assuming insurance fee based on risk rate
+  installment = round(payment, 2) + service_fee + insurance_fee
+
+  periods = list(range(1, period + 1))
+  due_dates = [add_months(start_date, i).isoformat() for i in range(period)]
+  principals = []
+  interests = []
+  balances = []
+  balance = amount
+  for _ in periods:
+    interest = balance * monthly_rate
+    principal = payment - interest
+    balance = balance - principal
+    principals.append(round(principal, 2))
+    interests.append(round(interest, 2))
+    balances.append(round(balance, 2))
+
+  return {
+    'period': periods,
+    'due_date': due_dates,
+    'installment': [installment] * period,
+    'principal': principals,
+    'interest': interests,
+    'service_fee': [service_fee] * period,
+    'insurance_fee': [insurance_fee] * period,
+    'balance': balances
+  }
+
+
+def columns_to_rows(columns):
+  return [dict(zip(SCHEDULE_FIELDS, row)) for row in zip(*(columns[field] for field in SCHEDULE_FIELDS))]
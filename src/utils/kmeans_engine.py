@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def feature_matrix(rows, feature_cols):
+    """Contiguous float64 (n, d) matrix from feature dicts; missing/None/0 values become 0"""
+    return np.ascontiguousarray(
+        [[float(row.get(col, 0) or 0) for col in feature_cols] for row in rows],
+        dtype=np.float64
+    ).reshape(len(rows), len(feature_cols))
+
+
+def zscore_params(X):
+    """Per-feature mean and population std (1 where a feature is constant)"""
+    means = X.mean(axis=0)
+    stds = X.std(axis=0)
+    stds[stds == 0] = 1.0
+    return means, stds
+
+
+def squared_distances(X, centroids):
+    """(n, k) squared Euclidean distances via |x|^2 - 2x.c + |c|^2, never materializing (n, k, d)"""
+    d2 = (np.einsum('ij,ij->i', X, X)[:, None]
+          - 2.0 * (X @ centroids.T)
+          + np.einsum('ij,ij->i', centroids, centroids)[None, :])
+    np.maximum(d2, 0.0, out=d2)
+    return d2
+
+
+def kmeans_plus_plus(X, k, rng):
+    """k-means++ seeding: each next seed is drawn proportionally to its squared distance"""
+    centroids = np.empty((k, X.shape[1]), dtype=np.float64)
+    centroids[0] = X[rng.integers(len(X))]
+    closest = squared_distances(X, centroids[:1])[:, 0]
+    for i in range(1, k):
+        total = closest.sum()
+        index = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centroids[i] = X[index]
+        np.minimum(closest, squared_distances(X, centroids[i:i + 1])[:, 0], out=closest)
+    return centroids
+
+
+def kmeans(X, k, init='k-means++', max_iter=100, tol=1e-6, seed=None):
+    """Lloyd's k-means; returns (centroids, labels, iterations).
+
+    init='first' seeds with the first k rows (the legacy behaviour); iteration stops once
+    no centroid moves more than tol. Empty clusters keep their previous centroid.
+    """
+    n = len(X)
+    if n < k:
+        centroids = X[np.arange(k) % n].copy()
+        return centroids, np.arange(n), 0
+
+    if init == 'first':
+        centroids = X[:k].copy()
+    else:
+        centroids = kmeans_plus_plus(X, k, np.random.default_rng(seed))
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        labels = squared_distances(X, centroids).argmin(axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        for cluster in range(k):
+            sums[cluster] = X[labels == cluster].sum(axis=0)
+        new_centroids = centroids.copy()
+        filled = counts > 0
+        new_centroids[filled] = sums[filled] / counts[filled, None]
+        shift = np.abs(new_centroids - centroids).max()
+        centroids = new_centroids
+        if shift <= tol:
+            break
+
+    return centroids, squared_distances(X, centroids).argmin(axis=1), iterations
+
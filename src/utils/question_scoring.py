@@ -1,24 +1,26 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-import locale
+import logging
 import math
+from functools import lru_cache
 from typing import List
 from models.defaults.defaults_dict import document_defaults
 from utils.functions import get_default
 import re
+from structured_logging import debug_enabled
 
-loc = locale.getlocale()
-locale.setlocale(locale.LC_MONETARY, loc)
+logger = logging.getLogger(__name__)
 
 class QuestionScoring():
   def __init__(self, strategy = None) -> None:
     self._strategy = self.select_scoring(strategy)
 
   def select_scoring(self, strategy):
+    # Strategies are stateless, so every QuestionScoring shares the same instances
     if strategy == 'demographics':
-      return DemographicsScoring()
+      return DEMOGRAPHICS_SCORING
     else:
-      return Default()
+      return BIAS_TABLE_SCORING
 
   def set_scoring(self, strategy: Strategy):
     self._strategy = strategy
@@ -43,11 +45,15 @@ class Strategy(ABC):
 
 
 class Default(Strategy):
-  def __init__(self):
-        self.count = 0
-        self.data = {}
+  @staticmethod
+  def likert_value(value) -> int:
+    # Convert to int, default to 3 if not valid
+    try:
+      return int(value) if isinstance(value, (int, str)) and str(value).isdigit() else 3
+    except (ValueError, TypeError):
+      return 3
 
-  def score_question(self, *args, i = 0):
+  def score_question(self, *args):
     section_data = args[0]
     
     # Handle different input structures
@@ -58,48 +64,58 @@ class Default(Strategy):
         # Direct data structure
         likert_data = section_data
     
-    if len(self.data) == 0:
-        self.data = {**self.data, **dict(likert_data)}
-    
-    if i == len(self.data):
-        if len(self.data) == 0:
-            return 5.0  # Default neutral score
-        raw_avg = self.count / len(self.data)
-        corrected_score = self.apply_bias_correction(raw_avg)
-        print(f"Raw average: {raw_avg}, Bias-corrected score: {corrected_score}")
-        return corrected_score
-    
-    key = list(self.data)[i]
-    value = self.data[key]
-    print(f"Scoring field: {key} with value: {value}")
+    if not isinstance(likert_data, dict):
+        likert_data = dict(likert_data)
     
-    # Convert to int, default to 3 if not valid
-    try:
-        partial = int(value) if isinstance(value, (int, str)) and str(value).isdigit() else 3
-    except (ValueError, TypeError):
-        partial = 3
+    if len(likert_data) == 0:
+        return 5.0  # Default neutral score
     
-    self.count = self.count + partial
-    print(f"Current count: {self.count}, Partial score: {partial}. Len: {len(self.data)}")
-    return self.score_question(self, args, i = i+1)
+    # One linear pass, no per-instance state
+    count = sum(map(self.likert_value, likert_data.values()))
+    corrected_score = self.corrected_score(count, len(likert_data))
+    if debug_enabled(logger):
+      logger.debug('likert section scored', extra={'questions': len(likert_data), 'rawAverage': count / len(likert_data),
+                                                   'correctedScore': corrected_score})
+    return corrected_score
 
+  def corrected_score(self, total: int, count: int) -> float:
+    return self.apply_bias_correction(total / count)
+
+
+class BiasTableScoring(Default):
+  """Default scoring with the bias correction read from a (sum, count) table.
+
+  n integer responses in 1..5 can only average to 4n+1 values, so sections of up to
+  PRECOMPUTED_MAX_QUESTIONS are precomputed; other sizes (or out-of-range sums) go
+  through an LRU cache. Entries are computed by apply_bias_correction, so they are
+  bit-identical to Default.
+  """
+  PRECOMPUTED_MAX_QUESTIONS = 12
 
-class DemographicsScoring(Strategy):
   def __init__(self):
-        self.count = 0
-        self.data = {}
-        self.gender_multiplier = 1.0
+    self.table = {
+      (total, count): self.apply_bias_correction(total / count)
+      for count in range(1, self.PRECOMPUTED_MAX_QUESTIONS + 1)
+      for total in range(count, 5 * count + 1)
+    }
+    self._uncommon = lru_cache(maxsize=2048)(super().corrected_score)
 
-  def field_score(self, key) -> float:
-    data = self.data[key]
-    print(f"Scoring field: {key} with value: {data}")
-    
+  def corrected_score(self, total: int, count: int) -> float:
+    score = self.table.get((total, count))
+    if score is None:
+      score = self._uncommon(total, count)
+    return score
+
+
+class DemographicsScoring(Strategy):
+  # Only gender and occupation contribute to the demographics score
+  relevant_fields = ('gender', 'occupation')
+
+  def field_score(self, key, data) -> float:
     if key == 'gender':
       if data == 'F':
-        self.gender_multiplier = 1.2  # 20% advantage for females
         return 6.0
       else:
-        self.gender_multiplier = 1.0
         return 3.0
     elif key == 'occupation':
       if data == 'Empleado':
@@ -111,22 +127,28 @@ class DemographicsScoring(Strategy):
     else:
       return 0.0  # Ignore other demographic fields
 
-  def score_question(self, *args, i = 0):
-    if len(self.data) == 0:
-        # Handle direct demographics data (no nested structure)
-        self.data = {**self.data, **dict(args[0])}
-    
-    # Only process gender and occupation fields
-    relevant_fields = ['gender', 'occupation']
-    relevant_data = {k: v for k, v in self.data.items() if k in relevant_fields}
-    
-    if i == len(relevant_data):
-        base_score = self.count / len(relevant_data) if len(relevant_data) > 0 else 4.0
-        final_score = base_score * self.gender_multiplier
-        print(f"Demographics base score: {base_score}, Gender multiplier: {self.gender_multiplier}, Final: {final_score}")
-        return final_score
+  def gender_multiplier(self, data) -> float:
+    return 1.2 if data == 'F' else 1.0  # 20% advantage for females
+
+  def score_question(self, *args):
+    count = 0
+    relevant = 0
+    gender_multiplier = 1.0
+    for key, value in dict(args[0]).items():
+      if key not in self.relevant_fields:
+        continue
+      relevant += 1
+      count += self.field_score(key, value)
+      if key == 'gender':
+        gender_multiplier = self.gender_multiplier(value)
     
-    key = list(relevant_data)[i]
-    self.count = self.count + self.field_score(key)
-    return self.score_question(self, args, i = i+1)
-       
\ No newline at end of file
+    base_score = count / relevant if relevant > 0 else 4.0
+    final_score = base_score * gender_multiplier
+    if debug_enabled(logger):
+      logger.debug('demographics scored', extra={'baseScore': base_score, 'genderMultiplier': gender_multiplier,
+                                                 'finalScore': final_score})
+    return final_score
+
+
+BIAS_TABLE_SCORING = BiasTableScoring()
+DEMOGRAPHICS_SCORING = DemographicsScoring()
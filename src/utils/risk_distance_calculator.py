@@ -1,176 +1,385 @@
-import math
-from services.non_defaulter_service import get_all_non_defaulters
+import os
+import threading
+from typing import NamedTuple
+import numpy as np
+from services.non_defaulter_service import get_all_non_defaulters, get_non_defaulter_fingerprint, get_non_defaulters_since
+from utils.kmeans_engine import feature_matrix, zscore_params, kmeans, squared_distances
+from instrumentation import stage, timed
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Bump when the artifact layout changes; older artifacts are ignored and refit in-process
+ARTIFACT_VERSION = 2
+DEFAULT_ARTIFACT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'risk_model.npz')
+
+def get_artifact_path():
+    return os.environ.get('RISK_MODEL_ARTIFACT', DEFAULT_ARTIFACT_PATH)
+
+class RiskModel(NamedTuple):
+    """Immutable fitted state; the calculator swaps whole snapshots, never mutates one"""
+    feature_means: np.ndarray
+    feature_stds: np.ndarray
+    centroids: np.ndarray
+    # Streaming state: Welford sums of squares and raw-space centroids with their sizes
+    feature_m2: np.ndarray
+    raw_centroids: np.ndarray
+    cluster_counts: np.ndarray
+    sample_count: int
+    fit_means: np.ndarray
+    fit_stds: np.ndarray
+    updates_since_fit: int = 0
+
+    def normalize(self, X):
+        return (X - self.feature_means) / self.feature_stds
+
+def frozen(array):
+    array = np.array(array, dtype=array.dtype)
+    array.setflags(write=False)
+    return array
+
+def new_model(feature_means, feature_stds, centroids, feature_m2, cluster_counts, sample_count):
+    feature_means, feature_stds = frozen(feature_means), frozen(feature_stds)
+    return RiskModel(
+        feature_means=feature_means,
+        feature_stds=feature_stds,
+        centroids=frozen(centroids),
+        feature_m2=frozen(feature_m2),
+        raw_centroids=frozen(centroids * feature_stds + feature_means),
+        cluster_counts=frozen(cluster_counts),
+        sample_count=int(sample_count),
+        fit_means=feature_means,
+        fit_stds=feature_stds
+    )
+
 class RiskDistanceCalculator:
-    def __init__(self):
-        self.non_defaulter_centroids = None
-        self.feature_means = None
-        self.feature_stds = None
+    """Clustered risk model behind an atomically swapped RiskModel snapshot.
+
+    Readers take one reference to self.model and never lock; writers (streaming updates,
+    refits) build a new snapshot and swap it in under a lock. Full refits run on a
+    background worker thread so requests never wait on one.
+    """
+    # Streaming updates trigger a background refit after this many inserts...
+    REFIT_EVERY = 500
+    # ...or once any feature mean drifts this many (fit-time) stds from where it was fitted
+    DRIFT_THRESHOLD = 0.25
+    # k-means++ seeding with a fixed seed keeps refits reproducible across containers
+    KMEANS_INIT = 'k-means++'
+    KMEANS_SEED = 42
+    KMEANS_MAX_ITER = 100
+
+    def __init__(self, session=None, initialize=True):
+        self.model = None
+        self._write_lock = threading.Lock()
+        self._refit_lock = threading.Lock()
+        self._refit_thread = None
+        self._refit_requested = False
+        # Rows streamed while a refit is reading/fitting, as (nrow, features); replayed before its swap
+        self._refits_in_flight = 0
+        self._journal = []
         self.feature_cols = ['demographics', 'financialResponsibility', 'riskAversion', 'impulsivity', 
                             'futureOrientation', 'financialKnowledge', 'locusOfControl', 'socialInfluence', 
                             'resilience', 'familismo', 'respect', 'risk_level']
-        self._initialize_model()
-    
-    def _calculate_mean_std(self, values):
-        """Calculate mean and standard deviation"""
-        n = len(values)
-        if n == 0:
-            return 0, 1
-        mean = sum(values) / n
-        variance = sum((x - mean) ** 2 for x in values) / n
-        std = math.sqrt(variance) if variance > 0 else 1
-        return mean, std
-    
-    def _euclidean_distance(self, point1, point2):
-        """Calculate Euclidean distance between two points"""
-        return math.sqrt(sum((a - b) ** 2 for a, b in zip(point1, point2)))
-    
-    def _simple_clustering(self, features, k=3):
-        """Simple k-means clustering without sklearn"""
-        if len(features) < k:
-            return [features[i % len(features)] for i in range(k)]
+        if initialize and not self._initialize_from_artifact(session):
+            self._initialize_model(session)
+    
+    @property
+    def non_defaulter_centroids(self):
+        model = self.model
+        return model.centroids if model else None
+    
+    @property
+    def feature_means(self):
+        model = self.model
+        return model.feature_means if model else None
+    
+    @property
+    def feature_stds(self):
+        model = self.model
+        return model.feature_stds if model else None
+    
+    def _cluster_k(self, n):
+        return min(3, max(2, n // 2))
+    
+    def _swap(self, model):
+        with self._write_lock:
+            self.model = model
+    
+    def fit(self, X):
+        """Fit normalization parameters and centroids on an (n, d) float64 feature matrix"""
+        model, k, iterations = self._fitted(X)
+        self._swap(model)
+        return k, iterations
+    
+    def _fitted(self, X):
+        """(snapshot, k, iterations) fitted on X, not yet swapped in"""
+        feature_means, feature_stds = zscore_params(X)
+        normalized = (X - feature_means) / feature_stds
         
-        # Initialize centroids randomly
-        centroids = features[:k]
+        k = self._cluster_k(len(X))
+        centroids, labels, iterations = kmeans(normalized, k, init=self.KMEANS_INIT,
+                                               max_iter=self.KMEANS_MAX_ITER, seed=self.KMEANS_SEED)
         
-        for _ in range(10):  # Max 10 iterations
-            clusters = [[] for _ in range(k)]
-            
-            # Assign points to nearest centroid
-            for point in features:
-                distances = [self._euclidean_distance(point, centroid) for centroid in centroids]
-                closest = distances.index(min(distances))
-                clusters[closest].append(point)
-            
-            # Update centroids
-            new_centroids = []
-            for cluster in clusters:
-                if cluster:
-                    centroid = [sum(dim) / len(cluster) for dim in zip(*cluster)]
-                    new_centroids.append(centroid)
-                else:
-                    new_centroids.append(centroids[len(new_centroids)])
+        # Seed the streaming state from the full fit
+        model = new_model(feature_means, feature_stds, centroids,
+                          feature_m2=((X - feature_means) ** 2).sum(axis=0),
+                          cluster_counts=np.bincount(labels, minlength=k),
+                          sample_count=len(X))
+        return model, k, iterations
+    
+    def save_artifact(self, path, fingerprint):
+        """Serialize the fitted state with its version and training-data fingerprint"""
+        model = self.model
+        with open(path, 'wb') as f:
+            np.savez(f,
+                     version=ARTIFACT_VERSION,
+                     fingerprint=np.array(fingerprint, dtype=np.int64),
+                     feature_cols=np.array(self.feature_cols),
+                     feature_means=model.feature_means,
+                     feature_stds=model.feature_stds,
+                     feature_m2=model.feature_m2,
+                     centroids=model.centroids,
+                     cluster_counts=model.cluster_counts)
+    
+    def load_artifact(self, path):
+        """Read an artifact; returns (model, (count, max_nrow, version_sum)), or (None, None) if unusable"""
+        if not os.path.exists(path):
+            return None, None
+        with np.load(path, allow_pickle=False) as artifact:
+            if int(artifact['version']) != ARTIFACT_VERSION or list(artifact['feature_cols']) != self.feature_cols:
+                logger.info(f"Ignoring risk model artifact {path}: version or feature columns changed")
+                return None, None
+            count, max_nrow, version_sum = (int(v) for v in artifact['fingerprint'])
+            model = new_model(artifact['feature_means'], artifact['feature_stds'], artifact['centroids'],
+                              feature_m2=artifact['feature_m2'],
+                              cluster_counts=artifact['cluster_counts'],
+                              sample_count=count)
+        return model, (count, max_nrow, version_sum)
+    
+    def _initialize_from_artifact(self, session=None):
+        """Load the offline-trained model and stream in rows added since; False means fit in-process"""
+        path = get_artifact_path()
+        try:
+            model, fingerprint = self.load_artifact(path)
+            if model is None:
+                return False
+            count, max_nrow, version_sum = fingerprint
+            current_count, current_max_nrow, current_version_sum = get_non_defaulter_fingerprint(session)
+            if (current_count, current_max_nrow, current_version_sum) == fingerprint:
+                self._swap(model)
+                logger.info(f"Loaded risk model artifact {path} ({count} non-defaulters)")
+                return True
             
-            centroids = new_centroids
-        
-        return centroids
+            # Only appends can be replayed, and only up to the streaming refit budget. Each appended row
+            # adds 1 to the version sum; anything more means a trained row was updated since
+            new_rows = current_count - count
+            if (current_max_nrow < max_nrow or not 0 < new_rows < self.REFIT_EVERY
+                    or current_version_sum - version_sum != new_rows):
+                logger.info(f"Risk model artifact {path} is stale, refitting in-process")
+                return False
+            newer = get_non_defaulters_since(max_nrow, session)
+            if len(newer) != new_rows:
+                logger.info(f"Risk model artifact {path} predates deletions, refitting in-process")
+                return False
+            for non_defaulter in newer:
+                model = self._streamed(model, feature_matrix([non_defaulter], self.feature_cols)[0])
+            self._swap(model)
+            if self._needs_refit(model):
+                self.refit_in_background()
+            logger.info(f"Loaded risk model artifact {path} and streamed {new_rows} newer non-defaulters")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading risk model artifact {path}: {str(e)}")
+            return False
     
-    def _initialize_model(self):
-        """Initialize clustering model with non-defaulter data"""
+    def _initialize_model(self, session=None):
+        """Initialize clustering model with non-defaulter data.
+
+        Rows streamed in by add_non_defaulter while the table is read and fitted are journaled
+        and replayed onto the fitted snapshot before it is swapped in, so none are lost.
+        """
+        with self._write_lock:
+            self._refits_in_flight += 1
         try:
-            non_defaulters = get_all_non_defaulters()
-            print(f"DEBUG: Retrieved {len(non_defaulters) if isinstance(non_defaulters, list) else 'ERROR'} non-defaulters")
+            non_defaulters = get_all_non_defaulters(session, include_nrow=True)
             
             if isinstance(non_defaulters, dict) and 'error' in non_defaulters:
-                print(f"DEBUG: Error loading non-defaulters: {non_defaulters['error']}")
+                logger.error(f"Error loading non-defaulters: {non_defaulters['error']}")
                 return False
             
             if len(non_defaulters) < 2:
-                print(f"DEBUG: Only {len(non_defaulters)} non-defaulters available, need at least 2")
+                logger.warning(f"Only {len(non_defaulters)} non-defaulters available, need at least 2")
                 return False
             
-            # Extract and normalize features
-            features = []
-            feature_values = {col: [] for col in self.feature_cols}
+            model, k, iterations = self._fitted(feature_matrix(non_defaulters, self.feature_cols))
+            fitted_nrows = {non_defaulter['nrow'] for non_defaulter in non_defaulters}
+            with self._write_lock:
+                # Only rows the table read missed: a row committed before the read is already fitted
+                replayed = [row for nrow, row in self._journal if nrow is None or nrow not in fitted_nrows]
+                for row in replayed:
+                    model = self._streamed(model, row)
+                self.model = model
             
-            for nd in non_defaulters:
-                feature_row = []
-                for col in self.feature_cols:
-                    value = nd.get(col, 0) or 0
-                    feature_row.append(float(value))
-                    feature_values[col].append(float(value))
-                features.append(feature_row)
-            
-            # Calculate normalization parameters
-            self.feature_means = []
-            self.feature_stds = []
-            for col in self.feature_cols:
-                mean, std = self._calculate_mean_std(feature_values[col])
-                self.feature_means.append(mean)
-                self.feature_stds.append(std)
-            
-            # Normalize features
-            normalized_features = []
-            for feature_row in features:
-                normalized_row = []
-                for i, value in enumerate(feature_row):
-                    normalized_value = (value - self.feature_means[i]) / self.feature_stds[i]
-                    normalized_row.append(normalized_value)
-                normalized_features.append(normalized_row)
-            
-            # Simple clustering
-            k = min(3, max(2, len(non_defaulters) // 2))
-            self.non_defaulter_centroids = self._simple_clustering(normalized_features, k)
-            
-            print(f"DEBUG: Successfully initialized risk calculator with {k} centroids")
-            logger.info(f"Initialized risk distance calculator with {k} centroids")
+            logger.info(f"Initialized risk distance calculator with {k} centroids after {iterations} k-means iterations"
+                        + (f", replayed {len(replayed)} non-defaulters streamed meanwhile" if replayed else ""))
             return True
             
         except Exception as e:
-            print(f"DEBUG: Exception in risk calculator init: {str(e)}")
             logger.error(f"Error initializing risk distance calculator: {str(e)}")
             return False
+        finally:
+            with self._write_lock:
+                self._refits_in_flight -= 1
+                if not self._refits_in_flight:
+                    self._journal = []
+    
+    def refit_in_background(self):
+        """Run _initialize_model on a worker thread; requests made while one runs coalesce into one more"""
+        with self._refit_lock:
+            if self._refit_thread is not None:
+                self._refit_requested = True
+                return
+            self._refit_thread = threading.Thread(target=self._refit_worker, name='risk-model-refit', daemon=True)
+            self._refit_thread.start()
+    
+    def _refit_worker(self):
+        while True:
+            # Own unpooled connection: the worker must neither share a request's connection nor
+            # hold the pool's only one during the table scan
+            from database import session_scope
+            with session_scope(background=True) as session:
+                self._initialize_model(session)
+            with self._refit_lock:
+                if not self._refit_requested:
+                    self._refit_thread = None
+                    return
+                self._refit_requested = False
     
+    def _streamed(self, model, row):
+        """New snapshot with one more point folded in (Welford + online k-means), O(k)"""
+        sample_count = model.sample_count + 1
+        delta = row - model.feature_means
+        feature_means = model.feature_means + delta / sample_count
+        feature_m2 = model.feature_m2 + delta * (row - feature_means)
+        feature_stds = np.sqrt(feature_m2 / sample_count)
+        feature_stds[feature_stds == 0] = 1.0
+        
+        # Move the closest raw centroid towards the point, then re-normalize all centroids
+        closest = int(squared_distances(model.normalize(row)[None, :], model.centroids).argmin())
+        cluster_counts = model.cluster_counts.copy()
+        cluster_counts[closest] += 1
+        raw_centroids = model.raw_centroids.copy()
+        raw_centroids[closest] += (row - raw_centroids[closest]) / cluster_counts[closest]
+        
+        return model._replace(
+            feature_means=frozen(feature_means),
+            feature_stds=frozen(feature_stds),
+            centroids=frozen((raw_centroids - feature_means) / feature_stds),
+            feature_m2=frozen(feature_m2),
+            raw_centroids=frozen(raw_centroids),
+            cluster_counts=frozen(cluster_counts),
+            sample_count=sample_count,
+            updates_since_fit=model.updates_since_fit + 1
+        )
+    
+    def _needs_refit(self, model):
+        drifted = (np.abs(model.feature_means - model.fit_means) / model.fit_stds > self.DRIFT_THRESHOLD).any()
+        return (model.updates_since_fit >= self.REFIT_EVERY or bool(drifted)
+                or self._cluster_k(model.sample_count) != len(model.centroids))
+    
+    def add_non_defaulter(self, non_defaulter, session=None):
+        """Fold one new (committed) non-defaulter into the model in O(k) instead of reloading the table.
+
+        Pass its 'nrow' so a concurrent refit that already read the row does not count it twice.
+        """
+        row = feature_matrix([non_defaulter], self.feature_cols)[0]
+        with self._write_lock:
+            if self._refits_in_flight:
+                self._journal.append((non_defaulter.get('nrow'), row))
+            model = self.model
+            if model is not None:
+                model = self._streamed(model, row)
+                self.model = model
+        
+        if model is None or self._needs_refit(model):
+            logger.info("Scheduling background risk model refit")
+            self.refit_in_background()
+        return model is not None
+    
+    @timed('risk_model')
     def calculate_risk_distance(self, user_scores):
         """Calculate risk distance for a single user"""
         try:
-            if self.non_defaulter_centroids is None:
+            # One snapshot for the whole calculation, even if a refit swaps in a new one meanwhile
+            model = self.model
+            if model is None:
                 return {'error': 'Risk distance calculator not initialized'}
             
             # Extract and normalize user features
-            user_features = []
-            for i, col in enumerate(self.feature_cols):
-                value = float(user_scores.get(col, 0) or 0)
-                normalized_value = (value - self.feature_means[i]) / self.feature_stds[i]
-                user_features.append(normalized_value)
+            user_features = model.normalize(feature_matrix([user_scores], self.feature_cols)[0])
             
             # Calculate distances to all centroids
-            distances = [self._euclidean_distance(user_features, centroid) 
-                        for centroid in self.non_defaulter_centroids]
+            distances = np.sqrt(((model.centroids - user_features) ** 2).sum(axis=1))
             
             # Get minimum distance and closest cluster
-            min_distance = min(distances)
-            closest_cluster = distances.index(min_distance)
+            closest_cluster = int(distances.argmin())
+            min_distance = float(distances[closest_cluster])
             
             # Normalize distance to risk score (0-100)
             max_expected_distance = 5.0  # Empirical max for normalized features
             risk_score = min(100, (min_distance / max_expected_distance) * 100)
             
-            # Risk categories
-            if risk_score <= 20:
-                risk_category = 'Very Low'
-            elif risk_score <= 40:
-                risk_category = 'Low'
-            elif risk_score <= 60:
-                risk_category = 'Medium'
-            elif risk_score <= 80:
-                risk_category = 'High'
-            else:
-                risk_category = 'Very High'
-            
             return {
                 'risk_distance': round(min_distance, 4),
                 'risk_score': round(risk_score, 2),
-                'risk_category': risk_category,
+                'risk_category': risk_category(risk_score),
                 'closest_cluster': closest_cluster
             }
             
         except Exception as e:
             logger.error(f"Error calculating risk distance: {str(e)}")
             return {'error': f'Risk calculation error: {str(e)}'}
+    
+    @timed('risk_model')
+    def calculate_risk_distances(self, X):
+        """Vectorized calculate_risk_distance for an (n, d) raw feature matrix.
+
+        Returns (risk_distance, risk_score, closest_cluster) arrays, rounded like the single-user path.
+        """
+        model = self.model
+        if model is None:
+            raise ValueError('Risk distance calculator not initialized')
+        d2 = squared_distances(model.normalize(X), model.centroids)
+        closest = d2.argmin(axis=1)
+        distances = np.sqrt(d2[np.arange(len(X)), closest])
+        max_expected_distance = 5.0  # Empirical max for normalized features
+        risk_scores = np.minimum(100, distances / max_expected_distance * 100)
+        return distances.round(4), risk_scores.round(2), closest
+
+def risk_category(risk_score):
+    if risk_score <= 20:
+        return 'Very Low'
+    elif risk_score <= 40:
+        return 'Low'
+    elif risk_score <= 60:
+        return 'Medium'
+    elif risk_score <= 80:
+        return 'High'
+    else:
+        return 'Very High'
 
 # Global instance
 risk_calculator = None
+_risk_calculator_lock = threading.Lock()
 
-def get_risk_calculator():
+def get_risk_calculator(session=None):
     """Lazy initialization of risk calculator"""
     global risk_calculator
     if risk_calculator is None:
-        risk_calculator = RiskDistanceCalculator()
-    elif risk_calculator.non_defaulter_centroids is None:
-        # Try to re-initialize if it failed before
-        risk_calculator._initialize_model()
+        with _risk_calculator_lock, stage('risk_model_init'):
+            if risk_calculator is None:
+                risk_calculator = RiskDistanceCalculator(session)
+    elif risk_calculator.model is None:
+        # Earlier init failed: retry off the request path instead of blocking this one
+        risk_calculator.refit_in_background()
     return risk_calculator
\ No newline at end of file
@@ -4,26 +4,24 @@ from math import ceil
 from operator import itemgetter
 from typing import List
 import logging
-from datetime import date
 # Removed numpy_financial to avoid numpy dependency
-# Using basic financial formulas instead
-from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
+# Using basic financial formulas instead (see utils.amortization_engine)
 
+from utils.amortization_engine import schedule_columns, columns_to_rows
 from utils.functions import cast_value, map_risk_to_rate
 
 logger = logging.getLogger(__name__)   
 
 
 class TableGenerator():
-  def __init__(self, strategy = None) -> None:
-    self._strategy = self.select_method(strategy)
+  def __init__(self, strategy = None, columnar = False, start_date = None) -> None:
+    self._strategy = self.select_method(strategy, columnar, start_date)
 
-  def select_method(self, strategy):
+  def select_method(self, strategy, columnar = False, start_date = None):
     if strategy == 'repayment_plan_period':
-      return GenerateByPeriod()
+      return GenerateByPeriod(columnar, start_date)
     elif strategy == 'repayment_plan_installment':
-      return GenerateByinstallment()
+      return GenerateByinstallment(columnar, start_date)
     else:
       return 'Not Implemented'
       
@@ -35,6 +33,12 @@ class TableGenerator():
 
 
 class Strategy(ABC):
+  def __init__(self, columnar = False, start_date = None):
+    # Columnar tables carry one array per field instead of one dict per row
+    self.columnar = columnar
+    # Due dates count from start_date (today if None) so stored plans stay reproducible
+    self.start_date = start_date
+
   @abstractmethod
   def generate_table(self, **kwargs: List):
     pass
@@ -46,35 +50,16 @@ class Strategy(ABC):
     }
   
   def calculate_values(self, r, period, amount):
-    results = []
-    balance = amount
-    
-    for i in range(1, int(period) + 1):
-      # Basic financial calculations without numpy
-      monthly_rate = r/12
-      payment = amount * (monthly_rate * (1 + monthly_rate)**period) / ((1 + monthly_rate)**period - 1)
-      
-      # Calculate interest and principal for this period
-      interest = balance * monthly_rate
-      principal = payment - interest
-      balance = balance - principal
-      
-      payment_date = date.today() + relativedelta(months=i-1)
-      service_fee = amount * 0.015  # Assuming 1.5% service fee
-      insurance_fee = amount * (r/100) # Assuming insurance fee based on risk rate
-      
-      results.append({
-        'period': i,
-        'due_date': payment_date.isoformat(),
-        'installment': round(payment, 2) + service_fee + insurance_fee,
-        'principal': round(principal, 2),
-        'interest': round(interest, 2),
-        'service_fee': service_fee,
-        'insurance_fee': insurance_fee,
-        'balance': round(balance, 2)
-      })
-    
-    return results
+    columns = schedule_columns(r, period, amount, self.start_date)
+    if self.columnar:
+      return columns
+    return columns_to_rows(columns)
+
+  def build_response(self, res, r):
+    data = {'data': res, 'rate': r}
+    if self.columnar:
+      data['format'] = 'columnar'
+    return data
 
 
 class GenerateByPeriod(Strategy):
@@ -82,8 +67,7 @@ class GenerateByPeriod(Strategy):
     user_risk, period, amount = itemgetter('user_risk', 'period', 'amount')(self.parse_args(**kwargs))
     r = map_risk_to_rate(user_risk)
     res = self.calculate_values(r=r, period=period, amount=amount)
-    data = {'data': res, 'rate': r}
-    return data
+    return self.build_response(res, r)
 
 
 class GenerateByinstallment(Strategy):
@@ -103,5 +87,13 @@ class GenerateByinstallment(Strategy):
     
     period = round(period)
     res = self.calculate_values(r=r, period=period, amount=amount)
-    data = {'data': res, 'rate': r}
-    return data
+    return self.build_response(res, r)
+
+
+def to_row_format(table):
+  """Convert a columnar table response to the default one-dict-per-row layout"""
+  if table.get('format') != 'columnar':
+    return table
+  rows = {k: v for k, v in table.items() if k != 'format'}
+  rows['data'] = columns_to_rows(table['data'])
+  return rows
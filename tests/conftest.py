@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# Same layout the Lambda uses: src modules import each other top-level
+for path in (ROOT, os.path.join(ROOT, 'src')):
+    sys.path.insert(0, path)
+
+@pytest.fixture(scope='session')
+def db(tmp_path_factory):
+    """The process-wide engine on a fresh SQLite file, migrated to the current schema"""
+    import database
+    workdir = tmp_path_factory.mktemp('db')
+    if database.engine is None:
+        os.environ['DATABASE_URL'] = f"sqlite:///{workdir / 'score_handler.db'}"
+    # Fit the risk model from the test rows, never from a locally trained src/risk_model.npz
+    os.environ['RISK_MODEL_ARTIFACT'] = str(workdir / 'risk_model.npz')
+    database.init_db()
+    database.ensure_schema()
+    return database
@@ -0,0 +1,19 @@
+import random
+
+SCORE_COLUMNS = ['demographics', 'financialResponsibility', 'riskAversion', 'impulsivity', 'futureOrientation',
+                 'financialKnowledge', 'locusOfControl', 'socialInfluence', 'resilience', 'familismo', 'respect']
+SURVEY_SECTIONS = SCORE_COLUMNS[1:9]
+
+def survey_body(uid, seed=0, sections=None):
+    """POST /survey body for uid with Likert answers drawn from seed"""
+    rng = random.Random(seed)
+    return {
+        'demographics': {'idNumber': uid, 'gender': rng.choice(['F', 'M']), 'occupation': 'Empleado'},
+        'sections': {section: {'metadata': {'weight': 1},
+                               'data': {f'q{q}': str(rng.randint(1, 5)) for q in range(10)}}
+                     for section in (sections or rng.sample(SURVEY_SECTIONS, 4))}
+    }
+
+def score_row(uid, rng):
+    """user_score / non_defaulters row with every score column set"""
+    return {'userId': uid, 'risk_level': rng.uniform(0, 100), **{col: rng.uniform(1, 9) for col in SCORE_COLUMNS}}
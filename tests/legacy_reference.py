@@ -0,0 +1,93 @@
+"""
+Pre-optimization implementations the equivalence tests compare against (and the benchmarks time).
+Kept verbatim apart from dropped prints; do not "fix" them.
+"""
+
+import math
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+class LegacyDefault:
+    """Default.score_question as it was before the single-pass engine (minus prints)"""
+    def __init__(self):
+        self.count = 0
+        self.data = {}
+
+    def apply_bias_correction(self, raw_score):
+        normalized = (raw_score - 1) / 4
+        corrected = 1 / (1 + math.exp(-6 * (normalized - 0.5)))
+        return 1 + (corrected * 8)
+
+    def score_question(self, *args, i=0):
+        section_data = args[0]
+        if isinstance(section_data, dict) and 'data' in section_data:
+            likert_data = section_data['data']
+        else:
+            likert_data = section_data
+        if len(self.data) == 0:
+            self.data = {**self.data, **dict(likert_data)}
+        if i == len(self.data):
+            if len(self.data) == 0:
+                return 5.0
+            return self.apply_bias_correction(self.count / len(self.data))
+        value = self.data[list(self.data)[i]]
+        try:
+            partial = int(value) if isinstance(value, (int, str)) and str(value).isdigit() else 3
+        except (ValueError, TypeError):
+            partial = 3
+        self.count = self.count + partial
+        return self.score_question(self, args, i=i+1)
+
+def legacy_calculate_values(r, period, amount):
+    """Strategy.calculate_values as it was before the single-pass engine"""
+    results = []
+    balance = amount
+    for i in range(1, int(period) + 1):
+        monthly_rate = r/12
+        payment = amount * (monthly_rate * (1 + monthly_rate)**period) / ((1 + monthly_rate)**period - 1)
+        interest = balance * monthly_rate
+        principal = payment - interest
+        balance = balance - principal
+        payment_date = date.today() + relativedelta(months=i-1)
+        service_fee = amount * 0.015
+        insurance_fee = amount * (r/100)
+        results.append({
+            'period': i,
+            'due_date': payment_date.isoformat(),
+            'installment': round(payment, 2) + service_fee + insurance_fee,
+            'principal': round(principal, 2),
+            'interest': round(interest, 2),
+            'service_fee': service_fee,
+            'insurance_fee': insurance_fee,
+            'balance': round(balance, 2)
+        })
+    return results
+
+def legacy_fit(rows, k):
+    """_initialize_model + _simple_clustering as they were before the NumPy engine"""
+    def distance(a, b):
+        return math.sqrt(sum((x - y) ** 2 for x, y in zip(a, b)))
+
+    columns = list(zip(*rows))
+    means = [sum(col) / len(col) for col in columns]
+    stds = []
+    for col, mean in zip(columns, means):
+        variance = sum((x - mean) ** 2 for x in col) / len(col)
+        stds.append(math.sqrt(variance) if variance > 0 else 1)
+    features = [[(v - means[i]) / stds[i] for i, v in enumerate(row)] for row in rows]
+
+    centroids = features[:k]
+    for _ in range(10):
+        clusters = [[] for _ in range(k)]
+        for point in features:
+            distances = [distance(point, c) for c in centroids]
+            clusters[distances.index(min(distances))].append(point)
+        new_centroids = []
+        for cluster in clusters:
+            if cluster:
+                new_centroids.append([sum(dim) / len(cluster) for dim in zip(*cluster)])
+            else:
+                new_centroids.append(centroids[len(new_centroids)])
+        centroids = new_centroids
+    return centroids
@@ -0,0 +1,15 @@
+import itertools
+
+import pytest
+
+from legacy_reference import legacy_calculate_values
+from utils.amortization_engine import columns_to_rows, schedule_columns
+
+PERIODS = [6, 12, 24, 36, 60, 120, 240, 360, 480]
+RATES = [0.21, 0.24, 0.37, 0.40]
+AMOUNTS = [1000, 25000, 350000]
+
+@pytest.mark.parametrize('r, period, amount', list(itertools.product(RATES, PERIODS, AMOUNTS)))
+def test_schedule_identical_to_legacy_loop(r, period, amount):
+    # Every column, dates included, to the cent: the rounded values must compare equal
+    assert columns_to_rows(schedule_columns(r, period, amount)) == legacy_calculate_values(r, period, amount)
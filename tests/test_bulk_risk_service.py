@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from sqlalchemy import func, select, update
+
+from database import session_scope, upsert
+from models.user_score import UserScore
+from services.bulk_risk_service import rescore_users
+from utils import risk_distance_calculator
+from utils.kmeans_engine import feature_matrix
+from utils.risk_distance_calculator import RiskDistanceCalculator
+
+@pytest.fixture
+def fitted_calculator(db, monkeypatch):
+    calculator = RiskDistanceCalculator(initialize=False)
+    calculator.fit(np.random.default_rng(7).uniform(1, 5, size=(40, len(calculator.feature_cols))))
+    monkeypatch.setattr(risk_distance_calculator, 'risk_calculator', calculator)
+    rng = np.random.default_rng(11)
+    with session_scope() as session:
+        upsert(session, UserScore, [
+            {'userId': f'bulk-{i}', **{col: float(v) for col, v in zip(calculator.feature_cols, rng.uniform(1, 5, 12))}}
+            for i in range(10)
+        ], returning=False)
+        session.execute(update(UserScore).values(risk_score=None, risk_distance=None, closest_cluster=None))
+    return calculator
+
+def scored_rows():
+    with session_scope() as session:
+        return session.scalar(select(func.count()).where(UserScore.risk_score.is_not(None)))
+
+def test_rescore_writes_the_vectorized_scores_in_chunks(fitted_calculator):
+    result = rescore_users(chunk_size=3)
+    with session_scope() as session:
+        users = session.scalars(select(UserScore).order_by(UserScore.nrow)).all()
+        distances, scores, closest = fitted_calculator.calculate_risk_distances(
+            feature_matrix([user.to_dict() for user in users], fitted_calculator.feature_cols))
+        assert result['rows'] == len(users)
+        assert [float(user.risk_distance) for user in users] == pytest.approx(distances.tolist(), abs=1e-4)
+        assert [user.closest_cluster for user in users] == closest.tolist()
+
+def test_a_failed_chunk_keeps_the_chunks_already_committed(fitted_calculator, monkeypatch):
+    calls = []
+    score_chunk = fitted_calculator.calculate_risk_distances
+    def failing_on_second_chunk(X):
+        calls.append(len(X))
+        if len(calls) == 2:
+            raise RuntimeError('lost connection')
+        return score_chunk(X)
+    monkeypatch.setattr(fitted_calculator, 'calculate_risk_distances', failing_on_second_chunk)
+
+    with pytest.raises(RuntimeError):
+        rescore_users(chunk_size=3)
+    assert scored_rows() == 3
@@ -0,0 +1,113 @@
+import pytest
+
+import cache
+from cache import InMemoryBackend, TTLCache, cache_from_env, user_risk_cache
+from database import on_commit, session_scope
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, 'monotonic', clock)
+    return clock
+
+def loader(value, calls):
+    def load():
+        calls.append(value)
+        return value
+    return load
+
+def test_least_recently_used_entry_is_evicted():
+    lru = TTLCache('test', max_entries=2)
+    calls = []
+    lru.get('a', loader(1, calls))
+    lru.get('b', loader(2, calls))
+    lru.get('a', loader(1, calls))      # 'a' is now the most recent
+    lru.get('c', loader(3, calls))      # evicts 'b'
+    assert len(lru) == 2
+    lru.get('a', loader(1, calls))
+    lru.get('b', loader(2, calls))
+    assert calls == [1, 2, 3, 2]
+    assert (lru.hits, lru.misses) == (2, 4)
+
+def test_entries_expire_after_the_ttl(clock):
+    ttl = TTLCache('test', ttl_seconds=60)
+    calls = []
+    ttl.get('a', loader(1, calls))
+    clock.now += 59.9
+    assert ttl.get('a', loader(2, calls)) == 1
+    clock.now += 0.1
+    assert ttl.get('a', loader(2, calls)) == 2
+    assert calls == [1, 2]
+
+def test_none_is_not_cached_but_falsy_values_are():
+    lru = TTLCache('test')
+    calls = []
+    assert lru.get('unknown', loader(None, calls)) is None
+    assert lru.get('unknown', loader(None, calls)) is None
+    assert lru.get('zero', loader(0.0, calls)) == 0.0
+    assert lru.get('zero', loader(1.0, calls)) == 0.0
+    assert calls == [None, None, 0.0]
+
+def test_shared_backend_serves_and_invalidates_other_containers(clock):
+    backend = InMemoryBackend()
+    first, second = TTLCache('test', backend=backend), TTLCache('test', backend=backend)
+    calls = []
+    first.get('a', loader(1, calls))
+    assert second.get('a', loader(2, calls)) == 1
+    first.invalidate('a')
+    second.clear()
+    assert second.get('a', loader(2, calls)) == 2
+    clock.now += 61
+    assert backend.get('test:a') is cache.MISSING
+    assert calls == [1, 2]
+
+def test_zero_size_from_env_disables_caching(monkeypatch):
+    monkeypatch.setenv('TEST_CACHE_SIZE', '0')
+    disabled = cache_from_env('test', 'TEST')
+    calls = []
+    disabled.get('a', loader(1, calls))
+    disabled.get('a', loader(1, calls))
+    assert calls == [1, 1] and len(disabled) == 0
+
+def test_on_commit_runs_after_the_outermost_commit_only(db):
+    ran = []
+    with session_scope() as session:
+        with session.begin_nested():
+            on_commit(session, lambda: ran.append('invalidate'))
+        # Releasing the savepoint is not the commit
+        assert ran == []
+    assert ran == ['invalidate']
+
+def test_rollback_drops_on_commit_callbacks(db):
+    ran = []
+    with pytest.raises(RuntimeError):
+        with session_scope() as session:
+            on_commit(session, lambda: ran.append('invalidate'))
+            raise RuntimeError('write failed')
+    assert ran == []
+
+    with session_scope() as session:
+        on_commit(session, lambda: ran.append('first'))
+        session.rollback()
+        on_commit(session, lambda: ran.append('second'))
+    assert ran == ['second']
+
+def test_survey_write_invalidates_the_cached_risk_once_committed(db):
+    from services.amortization_service import get_user_risk, load_user_risk
+    from services.register_survey_service import register_survey_method
+    from factories import survey_body
+
+    register_survey_method(survey_body('cache-user', seed=1))
+    before = get_user_risk('cache-user')
+    with session_scope() as session:
+        register_survey_method(survey_body('cache-user', seed=2), session)
+        # Not committed yet: the cached value must still be served, and not dropped early
+        assert user_risk_cache.get('cache-user', lambda: pytest.fail('invalidated before commit')) == before
+    assert get_user_risk('cache-user') == load_user_risk('cache-user') != before
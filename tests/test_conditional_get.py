@@ -0,0 +1,97 @@
+import random
+
+import pytest
+from sqlalchemy import func, select, text
+
+from database import session_scope, upsert
+from factories import score_row, survey_body
+from models.non_defaulter import NonDefaulter
+
+def get(path, query=None, etag=None):
+    from lambda_function import lambda_handler
+    headers = {'Origin': 'http://localhost:3000'}
+    if etag:
+        headers['If-None-Match'] = etag
+    return lambda_handler({'httpMethod': 'GET', 'path': path, 'headers': headers,
+                           'queryStringParameters': query, 'body': None}, {})
+
+@pytest.fixture
+def plan_user(db):
+    from services.amortization_service import repayment_plan
+    from services.register_survey_service import register_survey_method
+    register_survey_method(survey_body('etag-user', seed=1))
+    repayment_plan({'userId': 'etag-user', 'amount': 5000, 'period': 12, 'payment_type': 'period'})
+    return 'etag-user'
+
+@pytest.fixture
+def page(db):
+    """(query, nrows) of a keyset page holding only rows this test inserted"""
+    with session_scope() as session:
+        after = session.scalar(select(func.max(NonDefaulter.nrow))) or 0
+        rng = random.Random(after)
+        rows = upsert(session, NonDefaulter, [score_row(f'etag-nd-{after}-{i}', rng) for i in range(5)])
+        nrows = [row.nrow for row in rows]
+    return {'after': str(after), 'limit': '10'}, nrows
+
+def test_unchanged_plan_revalidates_with_an_empty_304(plan_user):
+    full = get(f'/repayment-plan/{plan_user}')
+    etag = full['headers']['ETag']
+    assert full['statusCode'] == 200 and full['headers']['Cache-Control'] == 'private, no-cache'
+    assert full['headers']['Vary'] == 'Accept, Origin'
+
+    for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+        revalidated = get(f'/repayment-plan/{plan_user}', etag=if_none_match)
+        assert (revalidated['statusCode'], revalidated['body']) == (304, '')
+        assert revalidated['headers']['ETag'] == etag
+
+def test_plan_etag_changes_with_its_inputs_and_representation(plan_user):
+    from services.amortization_service import repayment_plan
+    etag = get(f'/repayment-plan/{plan_user}')['headers']['ETag']
+    assert get(f'/repayment-plan/{plan_user}', {'format': 'columnar'})['headers']['ETag'] != etag
+
+    repayment_plan({'userId': plan_user, 'amount': 7000, 'period': 24, 'payment_type': 'period'})
+    changed = get(f'/repayment-plan/{plan_user}', etag=etag)
+    assert changed['statusCode'] == 200
+    assert changed['headers']['ETag'] != etag
+    assert len(changed['body']) > 0
+
+def test_unchanged_page_revalidates_with_an_empty_304(page):
+    query, _ = page
+    full = get('/non-defaulters', query)
+    etag = full['headers']['ETag']
+    # User IDs and scores: never cacheable by a shared cache unless explicitly configured
+    assert full['headers']['Cache-Control'] == 'private, no-cache'
+    revalidated = get('/non-defaulters', query, etag)
+    assert (revalidated['statusCode'], revalidated['body']) == (304, '')
+    assert get('/non-defaulters', {**query, 'format': 'ndjson'}, etag)['statusCode'] == 200
+
+@pytest.mark.parametrize('write', ['orm', 'sql', 'insert', 'delete'])
+def test_any_write_to_a_page_changes_its_etag(page, write):
+    query, nrows = page
+    etag = get('/non-defaulters', query)['headers']['ETag']
+    with session_scope() as session:
+        if write == 'orm':
+            session.get(NonDefaulter, nrows[2]).risk_level = 1.0
+        elif write == 'sql':
+            session.execute(text('UPDATE non_defaulters SET impulsivity = 2 WHERE nrow = :nrow'), {'nrow': nrows[2]})
+        elif write == 'insert':
+            session.add(NonDefaulter(userId=f'etag-nd-new-{nrows[0]}', risk_level=3.0))
+        else:
+            session.delete(session.get(NonDefaulter, nrows[2]))
+    changed = get('/non-defaulters', query, etag)
+    assert changed['statusCode'] == 200 and changed['headers']['ETag'] != etag
+
+def test_trigger_bumps_row_version_on_every_update(page):
+    _, nrows = page
+    version = lambda session: session.scalar(select(NonDefaulter.rowVersion).where(NonDefaulter.nrow == nrows[0]))
+    with session_scope() as session:
+        assert version(session) == 1
+    with session_scope() as session:
+        session.get(NonDefaulter, nrows[0]).respect = 4.0
+    with session_scope() as session:
+        assert version(session) == 2
+        session.execute(text('UPDATE non_defaulters SET respect = 5 WHERE nrow = :nrow'), {'nrow': nrows[0]})
+        upsert(session, NonDefaulter, [{'userId': session.get(NonDefaulter, nrows[0]).userId, 'respect': 6.0}],
+               returning=False)
+    with session_scope() as session:
+        assert version(session) == 4
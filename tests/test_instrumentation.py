@@ -0,0 +1,115 @@
+import json
+import random
+
+import pytest
+
+import instrumentation
+from factories import score_row, survey_body
+from instrumentation import metrics_scope, stage
+
+# Stages every request of a route must report (db_* init stages only appear on first use)
+EXPECTED_STAGES = {
+    'GET /health': {'parse', 'handler', 'serialize', 'duration'},
+    'POST /survey': {'parse', 'handler', 'scoring', 'db', 'db_commit', 'serialize', 'duration'},
+    'POST /clustered-score': {'parse', 'handler', 'scoring', 'risk_model', 'db', 'serialize', 'duration'},
+    'POST /repayment-plan': {'parse', 'handler', 'risk_lookup', 'plan', 'persist', 'db', 'serialize', 'duration'},
+    'GET /repayment-plan/{user_id}': {'parse', 'handler', 'db', 'serialize', 'duration'},
+    'GET /non-defaulters': {'parse', 'handler', 'db', 'serialize', 'duration'},
+}
+REQUIRED_METRICS = {'duration_ms', 'db_round_trips', 'cold_start', 'request_bytes', 'response_bytes'}
+
+def emf_problems(record):
+    """Schema problems in one decoded EMF line"""
+    problems = []
+    directive = record.get('_aws', {})
+    if not isinstance(directive.get('Timestamp'), int):
+        problems.append('missing _aws.Timestamp')
+    if not directive.get('CloudWatchMetrics'):
+        problems.append('missing CloudWatchMetrics')
+    for block in directive.get('CloudWatchMetrics', []):
+        if not block.get('Namespace'):
+            problems.append('missing Namespace')
+        for dimension_set in block.get('Dimensions', []):
+            problems.extend(f'dimension {name} not set' for name in dimension_set if name not in record)
+        declared = {metric['Name'] for metric in block.get('Metrics', [])}
+        problems.extend(f'{name} not declared' for name in REQUIRED_METRICS - declared)
+        problems.extend(f'{name} is not numeric' for name in declared
+                        if not isinstance(record.get(name), (int, float)))
+    return problems
+
+@pytest.fixture
+def emitted():
+    lines = []
+    previous = instrumentation.set_sink(lines.append)
+    yield lines
+    instrumentation.set_sink(previous)
+
+def test_stage_is_a_no_op_outside_a_request(emitted):
+    with stage('parse'):
+        pass
+    assert instrumentation.current_metrics() is None
+    assert emitted == []
+
+def test_scope_emits_one_line_with_accumulated_stages_and_counters(emitted):
+    with metrics_scope(requestId='r1', missing=None) as metrics:
+        metrics.dimensions['Route'] = 'GET /health'
+        with stage('db'):
+            pass
+        with stage('db'):
+            pass
+        instrumentation.count('db_round_trips', 2)
+        instrumentation.count('request_bytes', 10, 'Bytes')
+        instrumentation.count('response_bytes', 20, 'Bytes')
+
+    assert len(emitted) == 1
+    record = json.loads(emitted[0])
+    assert emf_problems(record) == []
+    assert record['Route'] == 'GET /health' and record['requestId'] == 'r1' and 'missing' not in record
+    assert record['db_round_trips'] == 2 and 'db_ms' in record
+    units = {m['Name']: m['Unit'] for m in record['_aws']['CloudWatchMetrics'][0]['Metrics']}
+    assert units['db_ms'] == 'Milliseconds' and units['request_bytes'] == 'Bytes'
+
+def test_metrics_disabled_emits_nothing(emitted, monkeypatch):
+    monkeypatch.setenv('METRICS_ENABLED', 'false')
+    with metrics_scope():
+        pass
+    assert emitted == []
+
+@pytest.fixture(scope='module')
+def route_events(db):
+    """[(route key, API Gateway v2 event)] covering every route, each twice, over seeded rows"""
+    from database import session_scope, upsert
+    from models.non_defaulter import NonDefaulter
+    from run_local import build_event
+
+    rng = random.Random(42)
+    with session_scope() as session:
+        upsert(session, NonDefaulter, [score_row(f'emf-nd-{i}', rng) for i in range(20)], returning=False)
+    headers = {'Content-Type': 'application/json', 'Origin': 'http://localhost:3000'}
+    requests = [
+        ('GET /health', 'GET', '/health', None),
+        ('POST /survey', 'POST', '/survey', survey_body('emf-user', seed=1)),
+        ('POST /clustered-score', 'POST', '/clustered-score', survey_body('emf-user-2', seed=2)),
+        ('POST /repayment-plan', 'POST', '/repayment-plan',
+         {'userId': 'emf-user', 'amount': 5000, 'period': 12, 'payment_type': 'period'}),
+        ('GET /repayment-plan/{user_id}', 'GET', '/repayment-plan/emf-user', None),
+        ('GET /non-defaulters', 'GET', '/non-defaulters?limit=10&after=0', None),
+    ]
+    return [(key, build_event(method, path, headers, json.dumps(body) if body is not None else None, 'v2'))
+            for _ in range(2) for key, method, path, body in requests]
+
+def test_every_route_emits_valid_emf_with_its_stages(route_events, emitted, monkeypatch):
+    from lambda_function import lambda_handler
+    monkeypatch.setattr(instrumentation, '_cold_start', True)
+    for _, event in route_events:
+        lambda_handler(event, {})
+
+    assert len(emitted) == len(route_events)
+    for i, ((key, _), line) in enumerate(zip(route_events, emitted)):
+        record = json.loads(line)
+        assert emf_problems(record) == [], key
+        assert record['cold_start'] == (1 if i == 0 else 0)
+        assert record['Route'] == key
+        assert record['statusCode'] < 400, key
+        stages = {name[:-3] for name in record if name.endswith('_ms')}
+        assert EXPECTED_STAGES[key] <= stages, key
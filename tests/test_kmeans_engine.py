@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from legacy_reference import legacy_fit
+from utils.kmeans_engine import feature_matrix, kmeans, kmeans_plus_plus, squared_distances, zscore_params
+
+FEATURES = 12
+
+def blobs(n, seed, spread=0.8):
+    """(X, true labels): n points around 3 random centers"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(1, 9, size=(3, FEATURES))
+    labels = rng.integers(3, size=n)
+    return centers[labels] + rng.normal(0, spread, size=(n, FEATURES)), labels
+
+def normalized(X):
+    means, stds = zscore_params(X)
+    return (X - means) / stds
+
+@pytest.mark.parametrize('seed', [7, 8, 9])
+def test_first_k_seeding_reproduces_legacy_centroids(seed):
+    X, _ = blobs(2000, seed)
+    centroids, _, _ = kmeans(normalized(X), 3, init='first', max_iter=10, tol=0.0)
+    np.testing.assert_allclose(centroids, np.array(legacy_fit(X.tolist(), 3)), rtol=0, atol=1e-9)
+
+def test_kmeans_converges_to_a_fixed_point_that_recovers_the_clusters():
+    X, truth = blobs(3000, 1, spread=0.3)
+    Z = normalized(X)
+    centroids, labels, iterations = kmeans(Z, 3, seed=42)
+
+    assert iterations < 100
+    # Converged: every centroid is the mean of the points assigned to it
+    np.testing.assert_allclose(centroids, [Z[labels == c].mean(axis=0) for c in range(3)], atol=1e-6)
+    # Each true cluster lands in exactly one k-means cluster
+    assert len({(t, l) for t, l in zip(truth, labels)}) == 3
+
+def test_kmeans_plus_plus_is_deterministic_per_seed():
+    Z = normalized(blobs(500, 2)[0])
+    first = kmeans_plus_plus(Z, 3, np.random.default_rng(42))
+    assert np.array_equal(first, kmeans_plus_plus(Z, 3, np.random.default_rng(42)))
+    # Seeds are rows of X, and pairwise distinct
+    assert all(any(np.array_equal(seed, row) for row in Z) for seed in first)
+    assert len({seed.tobytes() for seed in first}) == 3
+
+    fit = kmeans(Z, 3, seed=42)
+    again = kmeans(Z, 3, seed=42)
+    assert np.array_equal(fit[0], again[0]) and np.array_equal(fit[1], again[1]) and fit[2] == again[2]
+
+def test_kmeans_with_fewer_rows_than_clusters():
+    Z = np.array([[0.0, 1.0], [2.0, 3.0]])
+    centroids, labels, iterations = kmeans(Z, 3)
+    assert centroids.shape == (3, 2) and labels.tolist() == [0, 1] and iterations == 0
+
+def test_squared_distances_match_brute_force():
+    rng = np.random.default_rng(3)
+    X, C = rng.normal(size=(50, FEATURES)), rng.normal(size=(4, FEATURES))
+    np.testing.assert_allclose(squared_distances(X, C), ((X[:, None, :] - C[None, :, :]) ** 2).sum(axis=2), atol=1e-9)
+
+def test_zscore_params_leave_constant_features_unscaled():
+    X = feature_matrix([{'a': 1, 'b': 2}, {'a': 3, 'b': 2}, {'a': None, 'b': 2}], ['a', 'b'])
+    means, stds = zscore_params(X)
+    assert X[2].tolist() == [0.0, 2.0]
+    assert stds[1] == 1.0 and means.tolist() == pytest.approx([4 / 3, 2.0])
@@ -0,0 +1,35 @@
+import contextlib
+import io
+import random
+import struct
+
+import pytest
+
+from legacy_reference import LegacyDefault
+from utils.question_scoring import BiasTableScoring, Default, QuestionScoring
+
+SECTION_SIZES = [10, 25, 50, 100, 250, 500]
+
+def make_section(size, rng):
+    values = [str(rng.randint(1, 5)), rng.randint(1, 5), 'n/a', None, '']
+    return {'metadata': {'weight': 1}, 'data': {f'q{i}': rng.choice(values) for i in range(size)}}
+
+def sections():
+    rng = random.Random(42)
+    cases = [make_section(size, rng) for size in SECTION_SIZES for _ in range(20)]
+    return cases + [{}, {'data': {}}, {'q1': '5', 'q2': '1'}, [('q1', '4'), ('q2', 2)]]
+
+@pytest.mark.parametrize('section', sections())
+def test_single_pass_scores_match_legacy_strategy(section):
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert QuestionScoring('financialResponsibility').use_scoring(section) == LegacyDefault().score_question(section)
+
+def test_bias_table_is_bit_identical_to_apply_bias_correction():
+    default, table = Default(), BiasTableScoring()
+    mismatches = [
+        (total, count)
+        for count in range(1, max(SECTION_SIZES) + 1)
+        for total in range(0, 6 * count + 1)
+        if struct.pack('<d', table.corrected_score(total, count)) != struct.pack('<d', default.corrected_score(total, count))
+    ]
+    assert mismatches == []
@@ -0,0 +1,18 @@
+from factories import survey_body
+from services.register_survey_service import register_survey_batch, register_survey_method
+
+def test_batch_accepts_numeric_id_numbers(db):
+    result = register_survey_batch({'surveys': [survey_body(12345, seed=1), survey_body(12346, seed=2)]})
+    assert result['failed'] == 0
+    assert [row['userId'] for row in result['results']] == ['12345', '12346']
+
+def test_batch_merges_numeric_and_string_ids_into_one_row(db):
+    first = survey_body(22345, seed=1, sections=['riskAversion', 'impulsivity'])
+    second = survey_body('22345', seed=2, sections=['impulsivity', 'resilience'])
+    result = register_survey_batch([first, second])
+    assert result['failed'] == 0
+    assert result['results'][0] == result['results'][1]
+
+    register_survey_method(survey_body('22346', seed=1, sections=['riskAversion', 'impulsivity']))
+    sequential = register_survey_method(survey_body('22346', seed=2, sections=['impulsivity', 'resilience']))
+    assert {**result['results'][0], 'userId': '22346'} == sequential
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from lambda_function import COLUMNAR_MEDIA_TYPE, NDJSON_MEDIA_TYPE, requested_format, wants_columnar, wants_ndjson
+
+@pytest.mark.parametrize('value, expected', [
+    (None, None),
+    ('', None),
+    ('ndjson', 'ndjson'),
+    ('ndjson,ndjson', 'ndjson'),        # API Gateway v2 joins a repeated parameter with commas
+    ('columnar, ndjson', 'columnar'),
+    (['ndjson', 'columnar'], 'ndjson'),  # v1 multi-value parameters
+    ([], None),
+])
+def test_requested_format_takes_the_first_value(value, expected):
+    assert requested_format({'format': value}) == expected
+
+def test_format_and_accept_select_the_representation():
+    assert wants_ndjson({'format': 'ndjson,ndjson'}, {})
+    assert wants_columnar({'format': ['columnar']}, {})
+    assert not wants_ndjson({'format': 'columnar,ndjson'}, {})
+    assert wants_ndjson({}, {'accept': NDJSON_MEDIA_TYPE})
+    assert wants_columnar({}, {'Accept': f'{COLUMNAR_MEDIA_TYPE}, application/json'})
+    assert not wants_ndjson({}, {}) and not wants_columnar({}, {})
+
+def test_repeated_format_parameter_in_a_v2_event_still_exports_ndjson(db):
+    from lambda_function import lambda_handler
+    from run_local import build_event
+    event = build_event('GET', '/non-defaulters?format=ndjson&format=ndjson&limit=5', {}, None, 'v2')
+    assert event['queryStringParameters']['format'] == 'ndjson,ndjson'
+    response = lambda_handler(event, {})
+    assert response['statusCode'] == 200
+    assert response['headers']['Content-Type'] == NDJSON_MEDIA_TYPE
+    assert all(json.loads(line) for line in response['body'].splitlines())
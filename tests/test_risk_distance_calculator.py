@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+import pytest
+
+from utils import risk_distance_calculator
+from utils.kmeans_engine import feature_matrix, zscore_params
+from utils.risk_distance_calculator import ARTIFACT_VERSION, RiskDistanceCalculator
+
+FEATURE_COLS = RiskDistanceCalculator(initialize=False).feature_cols
+
+def rows(n, seed, start_nrow=1):
+    """Non-defaulter dicts with nrow, as get_all_non_defaulters(include_nrow=True) returns them"""
+    rng = np.random.default_rng(seed)
+    return [{'nrow': start_nrow + i, **dict(zip(FEATURE_COLS, rng.uniform(1, 9, len(FEATURE_COLS))))}
+            for i in range(n)]
+
+@pytest.fixture
+def calculator():
+    calculator = RiskDistanceCalculator(initialize=False)
+    # Never start a real background refit from these tests
+    calculator.refit_in_background = lambda: None
+    return calculator
+
+def test_streaming_matches_a_batch_fit_of_all_rows(calculator):
+    fitted, streamed = rows(100, 1), rows(150, 2, start_nrow=101)
+    calculator.fit(feature_matrix(fitted, FEATURE_COLS))
+    for row in streamed:
+        calculator.add_non_defaulter(row)
+
+    model = calculator.model
+    means, stds = zscore_params(feature_matrix(fitted + streamed, FEATURE_COLS))
+    np.testing.assert_allclose(model.feature_means, means, rtol=1e-12)
+    np.testing.assert_allclose(model.feature_stds, stds, rtol=1e-12)
+    assert model.sample_count == 250 and model.cluster_counts.sum() == 250
+    assert model.updates_since_fit == 150
+    np.testing.assert_allclose(model.centroids, (model.raw_centroids - model.feature_means) / model.feature_stds)
+
+def test_streaming_moves_the_closest_centroid_to_the_running_mean(calculator):
+    calculator.fit(feature_matrix(rows(50, 3), FEATURE_COLS))
+    before = calculator.model
+    row = rows(1, 4)[0]
+    closest = calculator.calculate_risk_distance(row)['closest_cluster']
+    calculator.add_non_defaulter(row)
+
+    after = calculator.model
+    count = before.cluster_counts[closest] + 1
+    expected = before.raw_centroids[closest] + (feature_matrix([row], FEATURE_COLS)[0] - before.raw_centroids[closest]) / count
+    np.testing.assert_allclose(after.raw_centroids[closest], expected)
+    others = [c for c in range(len(before.centroids)) if c != closest]
+    np.testing.assert_array_equal(after.raw_centroids[others], before.raw_centroids[others])
+    # The old snapshot is untouched: readers holding it see consistent state
+    assert before.sample_count == 50 and not before.centroids.flags.writeable
+
+def test_rows_streamed_during_a_refit_are_replayed_exactly_once(calculator, monkeypatch):
+    table = rows(60, 5)
+    calculator.fit(feature_matrix(table, FEATURE_COLS))
+    late = rows(2, 6, start_nrow=61)
+
+    def read_table(session=None, include_nrow=False):
+        snapshot = list(table)
+        # Commits landing between the refit's read and its swap: one already in the read, one after it,
+        # and one streamed without an nrow
+        calculator.add_non_defaulter(table[-1])
+        calculator.add_non_defaulter(late[0])
+        calculator.add_non_defaulter({key: value for key, value in late[1].items() if key != 'nrow'})
+        return snapshot
+    monkeypatch.setattr(risk_distance_calculator, 'get_all_non_defaulters', read_table)
+
+    assert calculator._initialize_model()
+    model = calculator.model
+    assert model.sample_count == 62
+    means, _ = zscore_params(feature_matrix(table + late, FEATURE_COLS))
+    np.testing.assert_allclose(model.feature_means, means, rtol=1e-12)
+    assert calculator._journal == [] and calculator._refits_in_flight == 0
+
+def test_journal_is_only_kept_while_a_refit_is_in_flight(calculator):
+    calculator.fit(feature_matrix(rows(10, 7), FEATURE_COLS))
+    calculator.add_non_defaulter(rows(1, 8, start_nrow=11)[0])
+    assert calculator._journal == []
+
+def test_refit_requests_coalesce_into_one_more_run(db, monkeypatch):
+    calculator = RiskDistanceCalculator(initialize=False)
+    started, release, runs = threading.Event(), threading.Event(), []
+    def slow_initialize(session=None):
+        runs.append(session)
+        started.set()
+        release.wait(5)
+        return True
+    monkeypatch.setattr(calculator, '_initialize_model', slow_initialize)
+
+    calculator.refit_in_background()
+    assert started.wait(5)
+    worker = calculator._refit_thread
+    for _ in range(5):
+        calculator.refit_in_background()
+    release.set()
+    worker.join(5)
+
+    assert len(runs) == 2
+    assert calculator._refit_thread is None and not calculator._refit_requested
+    # Each run got its own session, not one borrowed from a request
+    assert runs[0] is not runs[1] and runs[0] is not None
+
+def test_artifact_round_trip(calculator, tmp_path):
+    calculator.fit(feature_matrix(rows(40, 9), FEATURE_COLS))
+    path = str(tmp_path / 'risk_model.npz')
+    calculator.save_artifact(path, (40, 40, 40))
+
+    model, fingerprint = RiskDistanceCalculator(initialize=False).load_artifact(path)
+    assert fingerprint == (40, 40, 40)
+    for field in ('feature_means', 'feature_stds', 'feature_m2', 'centroids', 'cluster_counts'):
+        np.testing.assert_array_equal(getattr(model, field), getattr(calculator.model, field))
+    assert model.sample_count == 40
+
+def test_artifact_with_another_version_or_features_is_ignored(calculator, tmp_path, monkeypatch):
+    calculator.fit(feature_matrix(rows(40, 9), FEATURE_COLS))
+    path = str(tmp_path / 'risk_model.npz')
+    monkeypatch.setattr(risk_distance_calculator, 'ARTIFACT_VERSION', ARTIFACT_VERSION + 1)
+    calculator.save_artifact(path, (40, 40, 40))
+    monkeypatch.undo()
+    assert RiskDistanceCalculator(initialize=False).load_artifact(path) == (None, None)
+
+    calculator.save_artifact(path, (40, 40, 40))
+    other = RiskDistanceCalculator(initialize=False)
+    other.feature_cols = FEATURE_COLS[:-1]
+    assert other.load_artifact(path) == (None, None)
+    assert other.load_artifact(str(tmp_path / 'missing.npz')) == (None, None)
+
+@pytest.fixture
+def artifact(tmp_path, monkeypatch):
+    """Artifact trained on 40 never-updated rows (nrow 1..40), installed as RISK_MODEL_ARTIFACT"""
+    trainer = RiskDistanceCalculator(initialize=False)
+    trainer.fit(feature_matrix(rows(40, 9), FEATURE_COLS))
+    path = str(tmp_path / 'risk_model.npz')
+    trainer.save_artifact(path, (40, 40, 40))
+    monkeypatch.setenv('RISK_MODEL_ARTIFACT', path)
+    return trainer.model
+
+def fingerprint_is(monkeypatch, *fingerprint):
+    monkeypatch.setattr(risk_distance_calculator, 'get_non_defaulter_fingerprint', lambda session=None: fingerprint)
+
+def test_current_artifact_is_loaded_as_is(artifact, calculator, monkeypatch):
+    fingerprint_is(monkeypatch, 40, 40, 40)
+    assert calculator._initialize_from_artifact()
+    np.testing.assert_array_equal(calculator.model.centroids, artifact.centroids)
+
+def test_rows_appended_since_the_artifact_are_streamed_in(artifact, calculator, monkeypatch):
+    newer = rows(3, 10, start_nrow=41)
+    fingerprint_is(monkeypatch, 43, 43, 43)
+    monkeypatch.setattr(risk_distance_calculator, 'get_non_defaulters_since', lambda nrow, session=None: newer)
+    assert calculator._initialize_from_artifact()
+    assert calculator.model.sample_count == 43 and calculator.model.updates_since_fit == 3
+
+@pytest.mark.parametrize('fingerprint', [
+    (39, 40, 39),                                           # a row deleted
+    (40, 41, 40),                                           # a row deleted and one appended
+    (41, 39, 41),                                           # rows deleted below the trained max nrow
+    (40, 40, 41),                                           # a trained row updated in place
+    (41, 41, 42),                                           # an append and an in-place update
+    (40 + RiskDistanceCalculator.REFIT_EVERY, 600, 40 + RiskDistanceCalculator.REFIT_EVERY),  # too many appends
+])
+def test_stale_artifact_is_rejected(artifact, calculator, monkeypatch, fingerprint):
+    fingerprint_is(monkeypatch, *fingerprint)
+    monkeypatch.setattr(risk_distance_calculator, 'get_non_defaulters_since', lambda nrow, session=None: rows(1, 11))
+    assert not calculator._initialize_from_artifact()
+    assert calculator.model is None
+
+def test_fingerprint_changes_on_an_in_place_update(db):
+    from database import session_scope, upsert
+    from models.non_defaulter import NonDefaulter
+    from services.non_defaulter_service import get_non_defaulter_fingerprint
+    with session_scope() as session:
+        upsert(session, NonDefaulter, [{'userId': 'fingerprint-nd', 'risk_level': 10.0}], returning=False)
+    before = get_non_defaulter_fingerprint()
+    with session_scope() as session:
+        upsert(session, NonDefaulter, [{'userId': 'fingerprint-nd', 'risk_level': 20.0}], returning=False)
+    after = get_non_defaulter_fingerprint()
+    assert after[:2] == before[:2] and after[2] == before[2] + 1
@@ -0,0 +1,83 @@
+import pytest
+
+import secrets_provider
+from secrets_provider import RETRY_SECONDS, SecretsProvider, SecretsUnavailableError
+
+class Doppler:
+    """Stand-in for the Doppler download: a bundle, or None while it is down"""
+    def __init__(self, bundle):
+        self.bundle = bundle
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return (dict(self.bundle), 'doppler') if self.bundle is not None else (None, None)
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(secrets_provider.time, 'monotonic', lambda: now[0])
+    return now
+
+@pytest.fixture
+def doppler(monkeypatch):
+    monkeypatch.setenv('DOPPLER_TOKEN', 'token')
+    monkeypatch.delenv('SECRETS_FILE', raising=False)
+    monkeypatch.setenv('DATABASE_URL', 'postgresql://placeholder')
+    return Doppler({'DATABASE_URL': 'postgresql://real'})
+
+def provider(doppler):
+    provider = SecretsProvider(ttl_seconds=300, timeout=1)
+    provider._fetch_doppler = doppler
+    return provider
+
+def test_bundle_is_fetched_once_per_ttl(doppler, clock):
+    secrets = provider(doppler)
+    assert secrets.get('DATABASE_URL') == 'postgresql://real'
+    clock[0] += 299
+    secrets.get('DATABASE_URL')
+    assert doppler.calls == 1
+    clock[0] += 1
+    secrets.get('DATABASE_URL')
+    assert doppler.calls == 2
+
+def test_failed_refresh_keeps_the_last_good_bundle(doppler, clock):
+    secrets = provider(doppler)
+    secrets.get('DATABASE_URL')
+    doppler.bundle = None
+    clock[0] += 300
+    assert secrets.get('DATABASE_URL') == 'postgresql://real'
+    clock[0] += RETRY_SECONDS - 1
+    secrets.get('DATABASE_URL')
+    assert doppler.calls == 2
+    doppler.bundle = {'DATABASE_URL': 'postgresql://rotated'}
+    clock[0] += 1
+    assert secrets.get('DATABASE_URL') == 'postgresql://rotated'
+
+def test_failed_first_load_raises_instead_of_serving_env_defaults(doppler, clock):
+    secrets = provider(doppler)
+    doppler.bundle = None
+    with pytest.raises(SecretsUnavailableError):
+        secrets.get('DATABASE_URL')
+    with pytest.raises(SecretsUnavailableError):
+        secrets.get('DATABASE_URL')
+    assert doppler.calls == 2
+    doppler.bundle = {'DATABASE_URL': 'postgresql://real'}
+    assert secrets.get('DATABASE_URL') == 'postgresql://real'
+
+def test_failed_first_load_serves_the_secrets_file_and_retries_doppler_soon(doppler, clock, tmp_path, monkeypatch):
+    path = tmp_path / 'secrets.json'
+    path.write_text('{"DATABASE_URL": "postgresql://from-file"}')
+    monkeypatch.setenv('SECRETS_FILE', str(path))
+    secrets = provider(doppler)
+    doppler.bundle = None
+    assert secrets.get('DATABASE_URL') == 'postgresql://from-file'
+    doppler.bundle = {'DATABASE_URL': 'postgresql://real'}
+    clock[0] += RETRY_SECONDS
+    assert secrets.get('DATABASE_URL') == 'postgresql://real'
+
+def test_without_a_token_env_variables_are_the_source(doppler, clock, monkeypatch):
+    monkeypatch.delenv('DOPPLER_TOKEN')
+    secrets = SecretsProvider(ttl_seconds=300)
+    assert secrets.get('DATABASE_URL') == 'postgresql://placeholder'
+    assert secrets.source == 'env'